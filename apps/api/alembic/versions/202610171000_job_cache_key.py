@@ -0,0 +1,28 @@
+"""Job cache key
+
+Revision ID: 202610171000
+Revises: 202509271319
+Create Date: 2026-10-17 10:00:00.000000+00:00
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202610171000"
+down_revision = "202509271319"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("cache_key", sa.String(length=64), nullable=True))
+    op.create_index("ix_jobs_cache_key", "jobs", ["cache_key"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_cache_key", table_name="jobs")
+    op.drop_column("jobs", "cache_key")
@@ -0,0 +1,37 @@
+"""List pagination indexes
+
+Revision ID: 202610171100
+Revises: 202610171000
+Create Date: 2026-10-17 11:00:00.000000+00:00
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202610171100"
+down_revision = "202610171000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_assets_user_id_created_at_id",
+        "assets",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_jobs_user_id_created_at_id",
+        "jobs",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_user_id_created_at_id", table_name="jobs")
+    op.drop_index("ix_assets_user_id_created_at_id", table_name="assets")
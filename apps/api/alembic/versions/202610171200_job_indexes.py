@@ -0,0 +1,33 @@
+"""Job indexes
+
+Revision ID: 202610171200
+Revises: 202610171100
+Create Date: 2026-10-17 12:00:00.000000+00:00
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202610171200"
+down_revision = "202610171100"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Postgres folded the initial PRIMARY KEY(id) and UNIQUE(id) into one primary
+    # key constraint named uq_jobs_id; give it the conventional name, never drop it
+    op.execute("ALTER TABLE jobs RENAME CONSTRAINT uq_jobs_id TO jobs_pkey")
+    op.create_index("ix_jobs_input_asset_id", "jobs", ["input_asset_id"], unique=False)
+    op.create_index(
+        "ix_jobs_reference_asset_id", "jobs", ["reference_asset_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_reference_asset_id", table_name="jobs")
+    op.drop_index("ix_jobs_input_asset_id", table_name="jobs")
+    op.execute("ALTER TABLE jobs RENAME CONSTRAINT jobs_pkey TO uq_jobs_id")
@@ -0,0 +1,29 @@
+"""Job attempts
+
+Revision ID: 202610171400
+Revises: 202610171300
+Create Date: 2026-10-17 14:00:00.000000+00:00
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202610171400"
+down_revision = "202610171300"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs",
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("jobs", "attempts")
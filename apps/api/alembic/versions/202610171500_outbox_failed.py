@@ -0,0 +1,33 @@
+"""Outbox failed rows
+
+Revision ID: 202610171500
+Revises: 202610171400
+Create Date: 2026-10-17 15:00:00.000000+00:00
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "202610171500"
+down_revision = "202610171400"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox", sa.Column("failed_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_outbox_pending",
+        "outbox",
+        ["id"],
+        postgresql_where=sa.text("failed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.drop_column("outbox", "failed_at")
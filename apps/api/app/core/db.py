@@ -1,16 +1,65 @@
 from __future__ import annotations
 
+import time
 from typing import AsyncGenerator, AsyncIterator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
 from .settings import settings
 
 Base = declarative_base()
 
+
+class _TimedQueue(AsyncAdaptedQueue[ConnectionPoolEntry]):
+    """
+    Pool queue that records how long each checkout waited for a free connection.
+    Only the queue wait is timed: opening a new connection and the pre-ping
+    happen outside `get`.
+    """
+
+    def __init__(self, maxsize: int = 0, use_lifo: bool = False) -> None:
+        super().__init__(maxsize, use_lifo)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def get(
+        self, block: bool = True, timeout: float | None = None
+    ) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    _queue_class = _TimedQueue
+
+
 # Create async engine (psycopg3 async)
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    future=True,
+    poolclass=_TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        "prepare_threshold": settings.DB_PREPARE_THRESHOLD
+        if settings.DB_PREPARE_THRESHOLD >= 0
+        else None
+    },
+)
 
 # Async session factory (aka DB context)
 db_sessionmaker = async_sessionmaker(
@@ -30,3 +79,25 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 async def get_db_session() -> AsyncIterator[AsyncSession]:
     async for s in get_session():
         yield s
+
+
+def pool_stats() -> dict:
+    """Connection pool counters of this process (one pool per uvicorn worker)."""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    out: dict = {
+        "size": pool.size(),
+        "checkedOut": pool.checkedout(),
+        "checkedIn": pool.checkedin(),
+        # Negative until the pool has opened pool_size connections
+        "overflow": max(pool.overflow(), 0),
+    }
+    queue = pool._pool
+    if isinstance(queue, _TimedQueue):
+        out["checkouts"] = queue.checkouts
+        out["waitSecondsAvg"] = (
+            queue.wait_seconds_total / queue.checkouts if queue.checkouts else 0.0
+        )
+        out["waitSecondsMax"] = queue.wait_seconds_max
+    return out
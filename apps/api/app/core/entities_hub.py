@@ -1,4 +1,5 @@
 from app.features.assets import entities as assets_entities  # noqa: F401
 from app.features.mastering import entities as mastering_entities  # noqa: F401
+from app.features.outbox import entities as outbox_entities  # noqa: F401
 from app.features.tracks import entities as tracks_entities  # noqa: F401
 from app.features.users import entities as users_entities  # noqa: F401
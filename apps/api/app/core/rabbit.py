@@ -1,74 +1,144 @@
 import asyncio
+import itertools
 import json
-from typing import Mapping, Any
+from typing import Any, Mapping, Sequence
 
 import aio_pika
 import aio_pika.abc
+from pamqp.commands import Basic
+
 from .settings import settings
 
 _connection: aio_pika.abc.AbstractRobustConnection | None = None
-_channel: aio_pika.abc.AbstractChannel | None = None
-_exchange: aio_pika.abc.AbstractExchange | None = None
+# Confirm-mode publisher channels, used round-robin
+_channels: list[aio_pika.abc.AbstractChannel] = []
+_exchanges: list[aio_pika.abc.AbstractExchange] = []
+_round_robin: itertools.count = itertools.count()
 
 _init_lock = asyncio.Lock()
 
 
-async def get_channel() -> tuple[aio_pika.abc.AbstractChannel, aio_pika.abc.AbstractExchange]:
+def _pool_ready() -> bool:
+    return bool(_channels) and all(not ch.is_closed for ch in _channels)
+
+
+async def _get_exchanges() -> list[aio_pika.abc.AbstractExchange]:
     """
-    Return an open channel and declared exchange. Lazy-initialize connection and topology once.
-    Safe for concurrent calls via an initialization lock.
+    Return the exchange handle of every pooled publisher channel. Lazy-initialize
+    connection, channels and topology once. Safe for concurrent calls via an
+    initialization lock.
     """
-    global _connection, _channel, _exchange
+    global _connection, _channels, _exchanges
 
-    if _channel and not _channel.is_closed and _exchange is not None:
-        return _channel, _exchange
+    if _pool_ready():
+        return _exchanges
 
     async with _init_lock:
         # Re-check inside the lock to avoid duplicate init
-        if _channel and not _channel.is_closed and _exchange is not None:
-            return _channel, _exchange
+        if _pool_ready():
+            return _exchanges
+
+        # Part of the old pool may still be open; do not leak it
+        for channel in _channels:
+            if not channel.is_closed:
+                try:
+                    await channel.close()
+                except Exception:
+                    pass
+        _channels, _exchanges = [], []
 
         if _connection is None or _connection.is_closed:
             _connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
 
-        _channel = await _connection.channel()
-        await _channel.set_qos(prefetch_count=10)
+        channels: list[aio_pika.abc.AbstractChannel] = []
+        exchanges: list[aio_pika.abc.AbstractExchange] = []
+        for _ in range(max(1, settings.RMQ_PUBLISH_CHANNELS)):
+            channel = await _connection.channel(publisher_confirms=True)
+            exchange = await channel.declare_exchange(
+                settings.RMQ_EXCHANGE,
+                type=aio_pika.ExchangeType.DIRECT,
+                durable=True,
+            )
+            channels.append(channel)
+            exchanges.append(exchange)
 
-        _exchange = await _channel.declare_exchange(
-            settings.RMQ_EXCHANGE,
-            type=aio_pika.ExchangeType.DIRECT,
-            durable=True,
-        )
-        queue = await _channel.declare_queue(settings.RMQ_QUEUE, durable=True)
-        await queue.bind(_exchange, routing_key=settings.RMQ_ROUTING_KEY)
+        for queue_name, routing_key in (
+            (settings.RMQ_QUEUE, settings.RMQ_ROUTING_KEY),
+            (settings.RMQ_LONG_QUEUE, settings.RMQ_LONG_ROUTING_KEY),
+        ):
+            queue = await channels[0].declare_queue(queue_name, durable=True)
+            await queue.bind(exchanges[0], routing_key=routing_key)
 
-        return _channel, _exchange
+        _channels, _exchanges = channels, exchanges
+        return _exchanges
+
+
+def job_routing_key(duration_seconds: float | None) -> str:
+    """Lane for a job: long inputs get their own queue, the rest the default one."""
+    if (
+        duration_seconds is not None
+        and duration_seconds >= settings.LONG_JOB_MIN_SECONDS
+    ):
+        return settings.RMQ_LONG_ROUTING_KEY
+    return settings.RMQ_ROUTING_KEY
+
+
+def _job_message(message: Mapping[str, Any]) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=json.dumps(message).encode(),
+        content_type="application/json",
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        correlation_id=str(message.get("jobId", "")) or None,
+    )
 
 
 async def publish_job(message: Mapping[str, Any], routing_key: str | None = None) -> None:
     """
-    Publish a job message to the configured exchange with persistent delivery.
-    Optionally override the routing key.
+    Publish a job message to the configured exchange with persistent delivery
+    and wait for the broker confirm. Optionally override the routing key.
+    """
+    await publish_jobs([(message, routing_key)])
+
+
+async def publish_jobs(
+    messages: Sequence[tuple[Mapping[str, Any], str | None]],
+) -> list[BaseException | None]:
+    """
+    Publish many job messages at once, spread over the channel pool. All
+    publishes are in flight together and the broker confirms them in batches;
+    returns one entry per message, None when it was confirmed. A confirm that
+    does not arrive within RMQ_PUBLISH_TIMEOUT_SECONDS counts as a failure.
     """
-    _, exchange = await get_channel()
-    await exchange.publish(
-        aio_pika.Message(
-            body=json.dumps(message).encode(),
-            content_type="application/json",
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            correlation_id=str(message.get("jobId", "")) or None,
+    exchanges = await _get_exchanges()
+    results = await asyncio.gather(
+        *(
+            exchanges[next(_round_robin) % len(exchanges)].publish(
+                _job_message(message),
+                routing_key=routing_key or settings.RMQ_ROUTING_KEY,
+                timeout=settings.RMQ_PUBLISH_TIMEOUT_SECONDS,
+            )
+            for message, routing_key in messages
         ),
-        routing_key=routing_key or settings.RMQ_ROUTING_KEY,
+        return_exceptions=True,
     )
+    out: list[BaseException | None] = []
+    for r in results:
+        if isinstance(r, BaseException):
+            out.append(r)
+        elif isinstance(r, Basic.Ack):
+            out.append(None)
+        else:
+            out.append(RuntimeError(f"publish not confirmed: {r!r}"))
+    return out
 
 
 async def close() -> None:
-    """Close channel and connection for graceful shutdown."""
-    global _connection, _channel, _exchange
-    if _channel and not _channel.is_closed:
-        await _channel.close()
-    _channel = None
-    _exchange = None
+    """Close channels and connection for graceful shutdown."""
+    global _connection, _channels, _exchanges
+    for channel in _channels:
+        if not channel.is_closed:
+            await channel.close()
+    _channels, _exchanges = [], []
     if _connection and not _connection.is_closed:
         await _connection.close()
-    _connection = None
\ No newline at end of file
+    _connection = None
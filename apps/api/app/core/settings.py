@@ -5,17 +5,62 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str = ""
+    # SQLAlchemy pool, per uvicorn worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # psycopg prepares a statement server-side after N executions; -1 disables
+    # (required behind PgBouncer in transaction pooling mode)
+    DB_PREPARE_THRESHOLD: int = 5
     RABBITMQ_URL: str = ""
     RMQ_EXCHANGE: str = ""
     RMQ_EXCHANGE_TYPE: str = ""
     RMQ_QUEUE: str = ""
     RMQ_ROUTING_KEY: str = ""
+    # Inputs at least this long go to a separate lane so they do not hold up
+    # short tracks; unknown durations stay on the default lane
+    RMQ_LONG_QUEUE: str = "mastering.process.long"
+    RMQ_LONG_ROUTING_KEY: str = "process.long"
+    LONG_JOB_MIN_SECONDS: float = 600.0
+    # Confirm-mode channels used round-robin by the job publisher
+    RMQ_PUBLISH_CHANNELS: int = 4
+    # Longest wait for a broker confirm; a timeout counts as an unconfirmed publish
+    RMQ_PUBLISH_TIMEOUT_SECONDS: float = 10.0
+    # Job messages go through the outbox table; the relay drains it in batches
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 1.0
+    # Unconfirmed publishes per message before it is parked and its job failed
+    OUTBOX_MAX_ATTEMPTS: int = 20
 
     # Events (worker -> API)
     RMQ_EVENTS_EXCHANGE: str = ""
     RMQ_EVENTS_EXCHANGE_TYPE: str = ""
     RMQ_EVENTS_QUEUE: str = ""
     RMQ_EVENTS_ROUTING_KEY: str = ""
+    # Persist events once on a shared queue and fan job updates out per user
+    # (routing key "<prefix>.<userId>") to instances holding that user's sockets
+    EVENTS_PER_USER_ROUTING: bool = True
+    RMQ_EVENTS_USER_PREFIX: str = "user"
+    # Events are persisted in batches of up to N messages or W milliseconds
+    EVENTS_BATCH_MAX: int = 100
+    EVENTS_BATCH_WINDOW_MS: int = 20
+    # Intermediate job events are held this long so only the latest state is
+    # written and pushed; done/failed flush at once. 0 disables the hold.
+    EVENTS_COALESCE_MS: int = 100
+
+    # Reuse finished results for identical (input, reference, params) submissions.
+    # Bump the pipeline version whenever the worker output changes.
+    RESULT_CACHE_ENABLED: bool = True
+    MASTERING_PIPELINE_VERSION: str = "1"
+    # Most assets accepted by one /mastering/start-batch call (album/EP sized)
+    MASTERING_BATCH_MAX: int = 50
+
+    # Per-socket send queue (distinct jobs) and the longest a single send may take
+    # before the client is considered slow and disconnected
+    WS_SEND_QUEUE_MAX: int = 256
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
 
     S3_ENDPOINT: str = ""
     S3_REGION: str = ""
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import base64
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnExpressionArgument, literal, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID | str) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def keyset_before(
+    created_col: ColumnExpressionArgument[datetime],
+    id_col: ColumnExpressionArgument[uuid.UUID],
+    cursor: str,
+) -> ColumnElement[bool]:
+    """Rows strictly after the cursor in (created_at DESC, id DESC) order."""
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(created_col, id_col) < tuple_(literal(created_at), literal(row_id))
+
+
+def next_page(rows: list, limit: int) -> tuple[list, str | None]:
+    """Trim a limit + 1 fetch to one page and build the cursor for the next."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -5,6 +5,8 @@ from typing import Any, Dict, Literal
 
 from pydantic import BaseModel, Field
 
+AssetStatus = Literal["created", "uploaded"]
+
 
 class PresignedPost(BaseModel):
     url: str
@@ -30,7 +32,7 @@ class Asset(BaseModel):
     file_size: int = Field(..., alias="fileSize")
     file_name: str = Field(..., alias="fileName")
     duration_seconds: float | None = Field(None, alias="durationSeconds")
-    status: Literal["created", "uploaded"] = Field("created")
+    status: AssetStatus = Field("created")
     etag: str | None = None
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc), alias="createdAt"
@@ -12,7 +12,15 @@ if TYPE_CHECKING:
     from app.features.tracks.entities import Track
     from app.features.users.entities import User
 
-from sqlalchemy import BigInteger, CheckConstraint, DateTime, ForeignKey, String, Text
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -48,4 +56,6 @@ class Asset(Base):
 
     __table_args__ = (
         CheckConstraint("status in ('created','uploaded')", name="ck_assets_status"),
+        # Keyset pagination of a user's assets on (created_at, id)
+        Index("ix_assets_user_id_created_at_id", "user_id", "created_at", "id"),
     )
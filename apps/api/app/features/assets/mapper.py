@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from app.features.assets.entities import Asset
+
+from . import dto
+
+
+def to_dto(a: Asset) -> dto.Asset:
+    return dto.Asset.model_validate(
+        {
+            "id": str(a.id),
+            "userId": str(a.user_id),
+            "objectKey": a.s3_key,
+            "mimeType": a.mime_type,
+            "fileSize": a.file_size,
+            "fileName": a.file_name,
+            "durationSeconds": a.duration_seconds,
+            "status": a.status,
+            "etag": a.etag,
+            "createdAt": a.created_at,
+            "updatedAt": a.updated_at,
+        }
+    )
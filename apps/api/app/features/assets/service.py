@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import mimetypes
+import uuid
 from datetime import datetime, timezone
 
 from app.core.db import SessionLocal
@@ -10,40 +11,64 @@ from app.core.utils.assets import (
     ALLOWED_MIME_TYPES,
     MAX_FILE_SIZE_BYTES,
 )
+from app.core.utils.pagination import DEFAULT_PAGE_SIZE, keyset_before, next_page
 from app.features.assets.entities import Asset
 from fastapi import HTTPException, status
-from sqlalchemy import insert, select, update
+from sqlalchemy import Select, insert, select, update
 
 from . import dto
+from .mapper import to_dto
+
+# Plain column projection for list pages; skips ORM identity-map hydration
+_LIST_COLUMNS = (
+    Asset.id,
+    Asset.user_id,
+    Asset.s3_key,
+    Asset.mime_type,
+    Asset.file_size,
+    Asset.file_name,
+    Asset.duration_seconds,
+    Asset.status,
+    Asset.etag,
+    Asset.created_at,
+    Asset.updated_at,
+)
 
 
-async def list_assets(*, user_id: str) -> list[dto.Asset]:
+def list_assets_query(
+    *,
+    user_id: str,
+    limit: int,
+    cursor: str | None = None,
+    status_filter: str | None = None,
+) -> Select:
+    stmt = select(*_LIST_COLUMNS).where(Asset.user_id == user_id)
+    if status_filter:
+        stmt = stmt.where(Asset.status == status_filter)
+    if cursor:
+        stmt = stmt.where(keyset_before(Asset.created_at, Asset.id, cursor))
+    # One extra row tells whether a next page exists
+    return stmt.order_by(Asset.created_at.desc(), Asset.id.desc()).limit(limit + 1)
+
+
+async def list_assets(
+    *,
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    status_filter: str | None = None,
+) -> tuple[list[dto.Asset], str | None]:
     async with SessionLocal() as session:
-        stmt = (
-            select(Asset)
-            .where(Asset.user_id == user_id)
-            .order_by(Asset.created_at.desc())
-        )
-        res = await session.execute(stmt)
-        rows = res.scalars().all()
-        return [
-            dto.Asset.model_validate(
-                {
-                    "id": str(a.id),
-                    "userId": str(a.user_id),
-                    "objectKey": a.s3_key,
-                    "mimeType": a.mime_type,
-                    "fileSize": a.file_size,
-                    "durationSeconds": a.duration_seconds,
-                    "fileName": a.file_name,
-                    "status": a.status,
-                    "etag": a.etag,
-                    "createdAt": a.created_at,
-                    "updatedAt": a.updated_at,
-                }
+        res = await session.execute(
+            list_assets_query(
+                user_id=user_id,
+                limit=limit,
+                cursor=cursor,
+                status_filter=status_filter,
             )
-            for a in rows
-        ]
+        )
+        rows, next_cursor = next_page(list(res.all()), limit)
+        return [to_dto(a) for a in rows], next_cursor
 
 
 def _extension_from_mime_or_name(file_type: str, file_name: str) -> str:
@@ -81,17 +106,19 @@ async def create_asset(
             detail=f"File size {req.file_size} exceeds max of {MAX_FILE_SIZE_BYTES}",
         )
 
-    # Pre-generate id to embed into object key (UUID from DB)
+    # Client-generated id so the object key is known before the insert
     ext = _extension_from_mime_or_name(req.file_type, req.file_name)
-    # We'll create a temporary UUID by inserting first with a placeholder S3 key, then update
+    asset_id = uuid.uuid4()
+    object_key = f"assets/{user_id}/{asset_id}/original.{ext}"
 
     async with SessionLocal() as session:
         now = datetime.now(timezone.utc)
         ins = (
             insert(Asset)
             .values(
+                id=asset_id,
                 user_id=user_id,
-                s3_key="__pending__",
+                s3_key=object_key,
                 file_name=req.file_name,
                 mime_type=req.file_type,
                 file_size=req.file_size,
@@ -105,13 +132,6 @@ async def create_asset(
         )
         res = await session.execute(ins)
         created: Asset = res.scalar_one()
-        # now that we have id, build key and update
-        object_key = f"assets/{user_id}/{created.id}/original.{ext}"
-        await session.execute(
-            update(Asset)
-            .where(Asset.id == created.id)
-            .values(s3_key=object_key, updated_at=datetime.now(timezone.utc))
-        )
         await session.commit()
 
     # Create presigned POST for client direct upload
@@ -133,21 +153,7 @@ async def create_asset(
         ExpiresIn=3600,
     )
 
-    asset = dto.Asset.model_validate(
-        {
-            "id": str(created.id),
-            "userId": str(created.user_id),
-            "objectKey": object_key,
-            "mimeType": created.mime_type,
-            "fileSize": created.file_size,
-            "fileName": created.file_name,
-            "durationSeconds": created.duration_seconds,
-            "status": "created",
-            "etag": None,
-            "createdAt": now,
-            "updatedAt": now,
-        }
-    )
+    asset = to_dto(created)
     upload = dto.PresignedPost(url=presigned["url"], fields=presigned["fields"])
     return dto.AssetCreateResponse(asset=asset, upload=upload)
 
@@ -179,7 +185,7 @@ async def confirm_upload(
         except Exception:
             pass
 
-        await session.execute(
+        res2 = await session.execute(
             update(Asset)
             .where(Asset.id == asset_id, Asset.user_id == user_id)
             .values(
@@ -191,27 +197,11 @@ async def confirm_upload(
                 else asset_row.duration_seconds,
                 updated_at=datetime.now(timezone.utc),
             )
+            .returning(Asset)
         )
-        await session.commit()
-
-        # reload
-        res2 = await session.execute(select(Asset).where(Asset.id == asset_id))
         a: Asset = res2.scalar_one()
-        return dto.Asset.model_validate(
-            {
-                "id": str(a.id),
-                "userId": str(a.user_id),
-                "objectKey": a.s3_key,
-                "mimeType": a.mime_type,
-                "fileSize": a.file_size,
-                "fileName": a.file_name,
-                "durationSeconds": a.duration_seconds,
-                "status": a.status,
-                "etag": a.etag,
-                "createdAt": a.created_at,
-                "updatedAt": a.updated_at,
-            }
-        )
+        await session.commit()
+        return to_dto(a)
 
 
 async def get_asset(*, asset_id: str, user_id: str) -> dto.Asset:
@@ -224,20 +214,7 @@ async def get_asset(*, asset_id: str, user_id: str) -> dto.Asset:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Asset not found"
             )
-        return dto.Asset.model_validate(
-            {
-                "id": str(a.id),
-                "userId": str(a.user_id),
-                "object_key": a.s3_key,
-                "mimeType": a.mime_type,
-                "fileSize": a.file_size,
-                "durationSeconds": a.duration_seconds,
-                "status": a.status,
-                "etag": a.etag,
-                "created_at": a.created_at,
-                "updated_at": a.updated_at,
-            }
-        )
+        return to_dto(a)
 
 
 async def get_download_url(*, asset_id: str, user_id: str) -> dto.AssetDownloadUrl:
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from app.core.db import get_db_session
+from app.core.db import get_db_session, pool_stats
 from fastapi import APIRouter
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,4 +27,4 @@ async def healthz() -> dict:
             await gen.aclose()
         except Exception:
             pass
-    return {"ok": True, "db": db_ok}
+    return {"ok": True, "db": db_ok, "pool": pool_stats()}
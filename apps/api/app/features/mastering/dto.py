@@ -5,12 +5,19 @@ from typing import Literal
 
 from pydantic import BaseModel, Field
 
+JobStatus = Literal["queued", "processing", "done", "failed"]
+
 
 class StartMasteringRequest(BaseModel):
     asset_id: str = Field(..., alias="assetId")
     reference_asset_id: str | None = Field(None, alias="referenceAssetId")
 
 
+class StartMasteringBatchRequest(BaseModel):
+    asset_ids: list[str] = Field(..., alias="assetIds", min_length=1)
+    reference_asset_id: str | None = Field(None, alias="referenceAssetId")
+
+
 class MasteringJob(BaseModel):
     id: str = Field(...)
     user_id: str = Field(..., alias="userId")
@@ -18,11 +25,12 @@ class MasteringJob(BaseModel):
     reference_asset_id: str | None = Field(None, alias="referenceAssetId")
     object_key: str = Field(..., alias="objectKey")
     reference_object_key: str | None = Field(None, alias="referenceObjectKey")
-    status: Literal["queued", "processing", "done", "failed"] = "queued"
+    status: JobStatus = "queued"
     result_object_key: str | None = Field(None, alias="resultObjectKey")
     preview_object_key: str | None = Field(None, alias="previewObjectKey")
     file_name: str | None = Field(None, alias="fileName")
     last_error: str | None = Field(None, alias="lastError")
+    attempts: int = 0
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc), alias="createdAt"
     )
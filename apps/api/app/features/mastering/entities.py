@@ -14,9 +14,10 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
     String,
     Text,
-    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -43,6 +44,12 @@ class Job(Base):
     result_object_key: Mapped[str | None] = mapped_column(Text, nullable=True)
     preview_object_key: Mapped[str | None] = mapped_column(Text, nullable=True)
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Worker deliveries so far, including retries after transient errors
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Content address of (input, reference, params, pipeline version)
+    cache_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=False), default=utcnow, nullable=False
     )
@@ -60,5 +67,10 @@ class Job(Base):
         CheckConstraint(
             "status in ('queued','processing','done','failed')", name="ck_jobs_status"
         ),
-        UniqueConstraint("id", name="uq_jobs_id"),
+        Index("ix_jobs_cache_key", "cache_key"),
+        # Keyset pagination of a user's jobs on (created_at, id)
+        Index("ix_jobs_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Asset deletes cascade / set null through these foreign keys
+        Index("ix_jobs_input_asset_id", "input_asset_id"),
+        Index("ix_jobs_reference_asset_id", "reference_asset_id"),
     )
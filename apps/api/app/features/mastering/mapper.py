@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from app.features.mastering.entities import Job
+
+from . import dto
+
+
+def to_event_doc(j: Job) -> dict:
+    """Job document pushed to websocket clients on every status change."""
+    return {
+        "id": str(j.id),
+        "userId": str(j.user_id),
+        "inputAssetId": str(j.input_asset_id),
+        "referenceAssetId": str(j.reference_asset_id)
+        if j.reference_asset_id
+        else None,
+        "object_key": j.object_key,
+        "reference_object_key": j.reference_object_key,
+        "status": j.status,
+        "result_object_key": j.result_object_key,
+        "preview_object_key": j.preview_object_key,
+        "lastError": j.last_error,
+        "attempts": j.attempts,
+        "created_at": j.created_at,
+        "updated_at": j.updated_at,
+    }
+
+
+def to_dto(j: Job, *, file_name: str | None = None) -> dto.MasteringJob:
+    return dto.MasteringJob.model_validate({**to_event_doc(j), "fileName": file_name})
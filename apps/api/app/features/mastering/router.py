@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 from app.core.auth import require_user
-from fastapi import APIRouter, Request, status
+from app.core.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+)
+from fastapi import APIRouter, Query, Request, Response, status
 
 from . import dto, service
 
@@ -18,9 +23,20 @@ def _get_user_id(request: Request) -> str:
     response_model=list[dto.MasteringJob],
     status_code=status.HTTP_200_OK,
 )
-async def list_jobs(request: Request):
+async def list_jobs(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    status_filter: dto.JobStatus | None = Query(None, alias="status"),
+):
     user_id = _get_user_id(request)
-    return await service.list_jobs(user_id=user_id)
+    items, next_cursor = await service.list_jobs(
+        user_id=user_id, limit=limit, cursor=cursor, status_filter=status_filter
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
 
 @router.post(
@@ -33,6 +49,18 @@ async def start_mastering(req: dto.StartMasteringRequest, request: Request):
     return await service.start_mastering(req=req, user_id=user_id)
 
 
+@router.post(
+    "/mastering/start-batch",
+    response_model=list[dto.MasteringJob],
+    status_code=status.HTTP_201_CREATED,
+)
+async def start_mastering_batch(
+    req: dto.StartMasteringBatchRequest, request: Request
+):
+    user_id = _get_user_id(request)
+    return await service.start_mastering_batch(req=req, user_id=user_id)
+
+
 @router.get(
     "/mastering/{job_id}",
     response_model=dto.MasteringJob,
@@ -1,61 +1,135 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from datetime import datetime, timezone
+from typing import Sequence
 
 from app.core.db import SessionLocal
-from app.core.rabbit import publish_job
+from app.core.rabbit import job_routing_key
+from app.core.settings import settings
+from app.core.utils.pagination import DEFAULT_PAGE_SIZE, keyset_before, next_page
 from app.features.assets.entities import Asset
 from app.features.mastering.entities import Job
+from app.features.outbox import relay as outbox
 from fastapi import HTTPException, status
-from sqlalchemy import insert, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Select, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import dto
+from .mapper import to_dto
 
+# Plain column projection for list pages; skips ORM identity-map hydration
+_LIST_COLUMNS = (
+    Job.id,
+    Job.user_id,
+    Job.input_asset_id,
+    Job.reference_asset_id,
+    Job.object_key,
+    Job.reference_object_key,
+    Job.status,
+    Job.result_object_key,
+    Job.preview_object_key,
+    Job.last_error,
+    Job.attempts,
+    Job.created_at,
+    Job.updated_at,
+)
 
-async def list_jobs(*, user_id: str) -> list[dto.MasteringJob]:
-    async with SessionLocal() as session:
-        res = await session.execute(
-            select(Job)
-            .where(Job.user_id == user_id)
-            .options(joinedload(Job.input_asset))
-            .order_by(Job.created_at.desc())
+
+def _result_cache_key(
+    asset: Asset, ref_asset: Asset | None, params: dict
+) -> str | None:
+    """
+    Content address of a mastering result. None when either input has no
+    ETag yet, in which case the job is never served from cache.
+    """
+    if not settings.RESULT_CACHE_ENABLED or not asset.etag:
+        return None
+    if ref_asset is not None and not ref_asset.etag:
+        return None
+    doc = {
+        "input": asset.etag,
+        "reference": ref_asset.etag if ref_asset is not None else None,
+        "params": params,
+        "pipeline": settings.MASTERING_PIPELINE_VERSION,
+    }
+    raw = json.dumps(doc, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def list_jobs_query(
+    *,
+    user_id: str,
+    limit: int,
+    cursor: str | None = None,
+    status_filter: str | None = None,
+) -> Select:
+    stmt = (
+        select(*_LIST_COLUMNS, Asset.file_name)
+        .join(Asset, Asset.id == Job.input_asset_id)
+        .where(Job.user_id == user_id)
+    )
+    if status_filter:
+        stmt = stmt.where(Job.status == status_filter)
+    if cursor:
+        stmt = stmt.where(keyset_before(Job.created_at, Job.id, cursor))
+    # One extra row tells whether a next page exists
+    return stmt.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+
+
+def cached_results_query(*, user_id: str, cache_keys: Sequence[str]) -> Select:
+    # Newest finished job per key; DISTINCT ON keeps this one round trip
+    return (
+        select(Job)
+        .distinct(Job.cache_key)
+        .where(
+            Job.user_id == user_id,
+            Job.cache_key.in_(cache_keys),
+            Job.status == "done",
+            Job.result_object_key.is_not(None),
         )
-        rows = res.scalars().all()
-        out: list[dto.MasteringJob] = []
-        for j in rows:
-            out.append(
-                dto.MasteringJob.model_validate(
-                    {
-                        "id": str(j.id),
-                        "userId": str(j.user_id),
-                        "inputAssetId": str(j.input_asset_id),
-                        "referenceAssetId": str(j.reference_asset_id)
-                        if j.reference_asset_id
-                        else None,
-                        "objectKey": j.object_key,
-                        "referenceObjectKey": j.reference_object_key,
-                        "status": j.status,
-                        "resultObjectKey": j.result_object_key,
-                        "previewObjectKey": j.preview_object_key,
-                        "fileName": j.input_asset.file_name,
-                        "lastError": j.last_error,
-                        "createdAt": j.created_at,
-                        "updatedAt": j.updated_at,
-                    }
-                )
-            )
-        return out
+        .order_by(Job.cache_key, Job.created_at.desc())
+    )
 
 
-async def start_mastering(
-    *, req: dto.StartMasteringRequest, user_id: str
-) -> dto.MasteringJob:
+async def list_jobs(
+    *,
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    status_filter: str | None = None,
+) -> tuple[list[dto.MasteringJob], str | None]:
     async with SessionLocal() as session:
         res = await session.execute(
-            select(Asset).where(Asset.id == req.asset_id, Asset.user_id == user_id)
+            list_jobs_query(
+                user_id=user_id,
+                limit=limit,
+                cursor=cursor,
+                status_filter=status_filter,
+            )
         )
-        asset = res.scalar_one_or_none()
+        rows, next_cursor = next_page(list(res.all()), limit)
+        return [to_dto(j, file_name=j.file_name) for j in rows], next_cursor
+
+
+async def _load_uploaded_assets(
+    session: AsyncSession,
+    *,
+    user_id: str,
+    asset_ids: Sequence[str],
+    reference_asset_id: str | None,
+) -> tuple[dict[str, Asset], Asset | None]:
+    wanted = set(asset_ids)
+    if reference_asset_id:
+        wanted.add(reference_asset_id)
+    res = await session.execute(
+        select(Asset).where(Asset.id.in_(wanted), Asset.user_id == user_id)
+    )
+    by_id = {str(a.id): a for a in res.scalars().all()}
+
+    for asset_id in asset_ids:
+        asset = by_id.get(asset_id)
         if not asset:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Asset not found"
@@ -65,76 +139,135 @@ async def start_mastering(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Asset not uploaded yet"
             )
 
-        reference_object_key: str | None = None
-        reference_asset_id: str | None = None
-        if req.reference_asset_id:
-            res2 = await session.execute(
-                select(Asset).where(
-                    Asset.id == req.reference_asset_id, Asset.user_id == user_id
-                )
+    ref_asset: Asset | None = None
+    if reference_asset_id:
+        ref_asset = by_id.get(reference_asset_id)
+        if not ref_asset:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Reference asset not found",
             )
-            ref_asset = res2.scalar_one_or_none()
-            if not ref_asset:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Reference asset not found",
-                )
-            if ref_asset.status != "uploaded":
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Reference asset not uploaded yet",
-                )
-            reference_object_key = ref_asset.s3_key
-            reference_asset_id = str(ref_asset.id)
-
-        now = datetime.now(timezone.utc)
-        ins = (
-            insert(Job)
-            .values(
-                user_id=user_id,
-                input_asset_id=str(asset.id),
-                reference_asset_id=reference_asset_id,
-                object_key=asset.s3_key,
-                reference_object_key=reference_object_key,
-                status="queued",
-                result_object_key=None,
-                preview_object_key=None,
-                created_at=now,
-                updated_at=now,
+        if ref_asset.status != "uploaded":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Reference asset not uploaded yet",
             )
-            .returning(Job)
+    return by_id, ref_asset
+
+
+async def _start_jobs(
+    session: AsyncSession,
+    *,
+    user_id: str,
+    asset_ids: Sequence[str],
+    reference_asset_id: str | None,
+) -> list[dto.MasteringJob]:
+    """
+    Validate, insert and stage dispatch for every asset in a fixed number of
+    round trips: one asset SELECT, one cache lookup, one multi-row INSERT and
+    one outbox INSERT per lane. Jobs come back in request order.
+    """
+    by_id, ref_asset = await _load_uploaded_assets(
+        session,
+        user_id=user_id,
+        asset_ids=asset_ids,
+        reference_asset_id=reference_asset_id,
+    )
+    assets = [by_id[a] for a in asset_ids]
+
+    params: dict = {}
+    cache_keys = [_result_cache_key(a, ref_asset, params) for a in assets]
+    cached: dict[str, Job] = {}
+    wanted_keys = sorted({k for k in cache_keys if k})
+    if wanted_keys:
+        res_cached = await session.execute(
+            cached_results_query(user_id=user_id, cache_keys=wanted_keys)
         )
-        res3 = await session.execute(ins)
-        job = res3.scalar_one()
-        await session.commit()
+        cached = {j.cache_key: j for j in res_cached.scalars().all()}
 
-        await publish_job(
+    now = datetime.now(timezone.utc)
+    rows = []
+    for asset, cache_key in zip(assets, cache_keys):
+        hit = cached.get(cache_key) if cache_key else None
+        rows.append(
             {
-                "type": "job.start",
-                "jobId": str(job.id),
-                "object_key": job.object_key,
-                "params": {},
+                "user_id": user_id,
+                "input_asset_id": str(asset.id),
+                "reference_asset_id": str(ref_asset.id) if ref_asset else None,
+                "object_key": asset.s3_key,
+                "reference_object_key": ref_asset.s3_key if ref_asset else None,
+                "status": "done" if hit else "queued",
+                "result_object_key": hit.result_object_key if hit else None,
+                "preview_object_key": hit.preview_object_key if hit else None,
+                "cache_key": cache_key,
+                "created_at": now,
+                "updated_at": now,
             }
         )
+    res = await session.execute(
+        insert(Job).returning(Job, sort_by_parameter_order=True), rows
+    )
+    jobs = list(res.scalars().all())
 
-        return dto.MasteringJob.model_validate(
+    # Identical inputs that were already mastered point at the existing result;
+    # the rest are staged per lane (at most one outbox INSERT each)
+    lanes: dict[str, list[dict]] = {}
+    for job, asset in zip(jobs, assets):
+        if job.status != "queued":
+            continue
+        lanes.setdefault(job_routing_key(asset.duration_seconds), []).append(
             {
-                "id": str(job.id),
+                "type": "job.start",
+                "jobId": str(job.id),
                 "userId": str(job.user_id),
-                "inputAssetId": str(job.input_asset_id),
-                "referenceAssetId": str(job.reference_asset_id)
-                if job.reference_asset_id
-                else None,
                 "object_key": job.object_key,
+                "etag": asset.etag,
                 "reference_object_key": job.reference_object_key,
-                "status": job.status,
-                "result_object_key": job.result_object_key,
-                "preview_object_key": job.preview_object_key,
-                "lastError": job.last_error,
-                "created_at": job.created_at,
-                "updated_at": job.updated_at,
+                "reference_etag": ref_asset.etag if ref_asset else None,
+                "params": params,
             }
         )
+    for routing_key, messages in lanes.items():
+        await outbox.enqueue(session, messages, routing_key=routing_key)
+    return [to_dto(j, file_name=a.file_name) for j, a in zip(jobs, assets)]
+
+
+async def start_mastering(
+    *, req: dto.StartMasteringRequest, user_id: str
+) -> dto.MasteringJob:
+    async with SessionLocal() as session:
+        jobs = await _start_jobs(
+            session,
+            user_id=user_id,
+            asset_ids=[req.asset_id],
+            reference_asset_id=req.reference_asset_id,
+        )
+        await session.commit()
+    # Dispatch happens in the background relay; no broker round trip here
+    outbox.notify()
+    return jobs[0]
+
+
+async def start_mastering_batch(
+    *, req: dto.StartMasteringBatchRequest, user_id: str
+) -> list[dto.MasteringJob]:
+    if len(req.asset_ids) > settings.MASTERING_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MASTERING_BATCH_MAX} assets per batch",
+        )
+    async with SessionLocal() as session:
+        jobs = await _start_jobs(
+            session,
+            user_id=user_id,
+            asset_ids=req.asset_ids,
+            reference_asset_id=req.reference_asset_id,
+        )
+        # All jobs and their messages land in one transaction; the relay then
+        # publishes them together on the confirm channels
+        await session.commit()
+    outbox.notify()
+    return jobs
 
 
 async def get_status(*, job_id: str, user_id: str) -> dto.MasteringJob:
@@ -147,21 +280,4 @@ async def get_status(*, job_id: str, user_id: str) -> dto.MasteringJob:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
             )
-        return dto.MasteringJob.model_validate(
-            {
-                "id": str(j.id),
-                "userId": str(j.user_id),
-                "inputAssetId": str(j.input_asset_id),
-                "referenceAssetId": str(j.reference_asset_id)
-                if j.reference_asset_id
-                else None,
-                "object_key": j.object_key,
-                "reference_object_key": j.reference_object_key,
-                "status": j.status,
-                "result_object_key": j.result_object_key,
-                "preview_object_key": j.preview_object_key,
-                "lastError": j.last_error,
-                "created_at": j.created_at,
-                "updated_at": j.updated_at,
-            }
-        )
+        return to_dto(j)
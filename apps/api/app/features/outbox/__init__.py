@@ -0,0 +1 @@
+"""Outbox feature: transactional job dispatch to RabbitMQ."""
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from app.core.db import Base
+from app.core.utils.time import utcnow
+from sqlalchemy import BigInteger, DateTime, Identity, Index, Integer, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class OutboxMessage(Base):
+    """A job message written in the same transaction as its job, relayed later."""
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    routing_key: Mapped[str | None] = mapped_column(Text, nullable=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=utcnow, nullable=False
+    )
+    # Set when the relay gave up after OUTBOX_MAX_ATTEMPTS; kept for inspection
+    failed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=False), nullable=True
+    )
+
+    __table_args__ = (
+        Index("ix_outbox_pending", "id", postgresql_where=text("failed_at IS NULL")),
+    )
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Mapping, Sequence
+
+from app.core.db import SessionLocal
+from app.core.rabbit import publish_jobs
+from app.core.settings import settings
+from app.core.utils.time import utcnow
+from app.features.mastering.entities import Job
+from app.features.outbox.entities import OutboxMessage
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_relay_task: asyncio.Task | None = None
+_wakeup = asyncio.Event()
+
+
+async def enqueue(
+    session: AsyncSession,
+    messages: Sequence[Mapping[str, Any]],
+    routing_key: str | None = None,
+) -> None:
+    """
+    Stage job messages in the caller's transaction. They reach the broker only
+    once that transaction commits; call `notify()` afterwards to relay them
+    without waiting for the next poll.
+    """
+    if not messages:
+        return
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        insert(OutboxMessage),
+        [
+            {"routing_key": routing_key, "payload": dict(m), "created_at": now}
+            for m in messages
+        ],
+    )
+
+
+def notify() -> None:
+    _wakeup.set()
+
+
+async def _give_up(
+    session: AsyncSession, row: OutboxMessage, err: BaseException
+) -> None:
+    """Park a message that was never confirmed and fail the job it would start."""
+    error = f"job message not published after {row.attempts + 1} attempts: {err}"
+    await session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == row.id)
+        .values(
+            attempts=OutboxMessage.attempts + 1,
+            last_error=str(err)[:500],
+            failed_at=utcnow(),
+        )
+    )
+    job_id = row.payload.get("jobId")
+    if job_id:
+        # A queued job never reached a worker; anything further along did
+        await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="failed", last_error=error[:500])
+        )
+    print(
+        "[api] outbox message given up",
+        {
+            "id": row.id,
+            "jobId": job_id,
+            "attempts": row.attempts + 1,
+            "error": str(err),
+        },
+    )
+
+
+async def relay_once() -> int:
+    """
+    Publish one batch of pending messages and delete the confirmed ones.
+    Rows are locked with SKIP LOCKED so several API instances can relay
+    concurrently; delivery is at-least-once. A message still unconfirmed after
+    OUTBOX_MAX_ATTEMPTS publishes is kept with `failed_at` set and its job is
+    marked failed.
+    """
+    async with SessionLocal() as session:
+        res = await session.execute(
+            select(OutboxMessage)
+            .where(OutboxMessage.failed_at.is_(None))
+            .order_by(OutboxMessage.id)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        rows = list(res.scalars().all())
+        if not rows:
+            return 0
+
+        errors = await publish_jobs([(r.payload, r.routing_key) for r in rows])
+        sent = [r.id for r, err in zip(rows, errors) if err is None]
+        failed = [(r, err) for r, err in zip(rows, errors) if err is not None]
+        if sent:
+            await session.execute(
+                delete(OutboxMessage).where(OutboxMessage.id.in_(sent))
+            )
+        retrying = 0
+        for row, err in failed:
+            if row.attempts + 1 >= settings.OUTBOX_MAX_ATTEMPTS:
+                await _give_up(session, row, err)
+                continue
+            retrying += 1
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == row.id)
+                .values(
+                    attempts=OutboxMessage.attempts + 1, last_error=str(err)[:500]
+                )
+            )
+        await session.commit()
+        if retrying:
+            raise RuntimeError(f"{retrying} outbox message(s) not confirmed")
+        return len(sent)
+
+
+async def _relay_loop() -> None:
+    print("[api] starting outbox relay", {"batch": settings.OUTBOX_BATCH_SIZE})
+    backoff = 0.0
+    while True:
+        try:
+            # Keep draining while full batches come back
+            while await relay_once() >= settings.OUTBOX_BATCH_SIZE:
+                pass
+            backoff = 0.0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            backoff = min(max(backoff * 2, 0.5), 30.0)
+            print("[api] outbox relay failed", {"error": str(e), "retry_in": backoff})
+            await asyncio.sleep(backoff)
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_outbox_relay() -> None:
+    global _relay_task
+    if _relay_task is None or _relay_task.done():
+        _relay_task = asyncio.create_task(_relay_loop())
+
+
+def stop_outbox_relay() -> None:
+    global _relay_task
+    if _relay_task and not _relay_task.done():
+        _relay_task.cancel()
+    _relay_task = None
@@ -2,115 +2,491 @@ from __future__ import annotations
 
 import asyncio
 import json
+import uuid
 from datetime import datetime, timezone
 from typing import Awaitable, Callable
 
 import aio_pika
+from aio_pika.abc import AbstractIncomingMessage
 from app.core.db import SessionLocal
 from app.core.settings import settings
 from app.features.mastering.entities import Job
-from sqlalchemy import select
+from app.features.mastering.mapper import to_event_doc
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    Text,
+    Update,
+    cast,
+    column,
+    func,
+    or_,
+)
 from sqlalchemy import update as sa_update
+from sqlalchemy import values as sa_values
+from sqlalchemy.dialects.postgresql import UUID
 
 _events_task: asyncio.Task | None = None
+_events_exchange: aio_pika.abc.AbstractExchange | None = None
+# Per-instance queue for per-user job updates and the users bound to it
+_user_queue: aio_pika.abc.AbstractQueue | None = None
+_subscribed_users: set[str] = set()
 
+_TERMINAL_STATUSES = ("done", "failed")
+_FINAL_EVENTS = ("job.done", "job.failed")
+# Advisory render progress; forwarded to sockets, never written to the database
+_PROGRESS_EVENT = "job.progress"
 
-async def _consume_events(handler: Callable[[str, dict], Awaitable[None]]) -> None:
+# Pause before handing a batch back after a failed write (e.g. database down)
+_PERSIST_RETRY_DELAY = 1.0
+
+JobUpdateHandler = Callable[[str, dict], Awaitable[None]]
+# (user id, job id, progress data)
+ProgressHandler = Callable[[str, str, dict], Awaitable[None]]
+
+
+def _decode(message: AbstractIncomingMessage) -> dict | None:
+    try:
+        payload = json.loads(message.body.decode())
+    except Exception:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _parse_event(payload: dict) -> tuple[uuid.UUID, str, dict] | None:
+    try:
+        job_id = uuid.UUID(str(payload.get("jobId")))
+    except Exception:
+        return None
+    event_type = payload.get("type")
+    if not event_type:
+        return None
+    return job_id, event_type, payload.get("data", {}) or {}
+
+
+def fold_events(events: list[tuple[uuid.UUID, str, dict]]) -> list[dict]:
+    """
+    Collapse a batch into one row per job, applying events in arrival order.
+    Only a row holding a final event may change a job that has already finished:
+    events for one job can be handled by several API instances, and a row held
+    in another instance's coalescer must not undo a done or failed status.
+    """
+    rows: dict[uuid.UUID, dict] = {}
+    now = datetime.now(timezone.utc)
+    for job_id, event_type, data in events:
+        row = rows.setdefault(
+            job_id,
+            {
+                "id": job_id,
+                "status": None,
+                "result_object_key": None,
+                "preview_object_key": None,
+                "last_error": None,
+                "attempts": None,
+                "final": False,
+                "updated_at": now,
+            },
+        )
+        if row["final"] and event_type not in _FINAL_EVENTS:
+            # Late intermediate event (e.g. a redelivery); the job has finished
+            continue
+        if event_type == "job.preview_ready":
+            if "preview_object_key" in data:
+                row["preview_object_key"] = data["preview_object_key"]
+            continue
+        if "attempt" in data:
+            row["attempts"] = max(row["attempts"] or 0, int(data["attempt"]))
+        if event_type == "job.processing":
+            row["status"] = "processing"
+        elif event_type == "job.retrying":
+            # Transient failure; the worker redelivers the job after a backoff
+            row["status"] = "queued"
+            if "error" in data:
+                row["last_error"] = str(data["error"])[:500]
+        elif event_type == "job.done":
+            row["final"] = True
+            row["status"] = "done"
+            if "result_object_key" in data:
+                row["result_object_key"] = data["result_object_key"]
+            if "preview_object_key" in data:
+                row["preview_object_key"] = data["preview_object_key"]
+        elif event_type == "job.failed":
+            row["final"] = True
+            row["status"] = "failed"
+            if "error" in data:
+                row["last_error"] = str(data["error"])[:500]
+    return list(rows.values())
+
+
+def bulk_update_query(rows: list[dict]) -> Update:
+    """UPDATE jobs ... FROM (VALUES ...) RETURNING for a folded batch."""
+    v = (
+        sa_values(
+            column("id", UUID(as_uuid=True)),
+            column("status", Text),
+            column("result_object_key", Text),
+            column("preview_object_key", Text),
+            column("last_error", Text),
+            column("attempts", Integer),
+            column("final", Boolean),
+            column("updated_at", DateTime(timezone=False)),
+            name="v",
+        )
+        .data(
+            [
+                (
+                    r["id"],
+                    r["status"],
+                    r["result_object_key"],
+                    r["preview_object_key"],
+                    r["last_error"],
+                    r["attempts"],
+                    r["final"],
+                    r["updated_at"],
+                )
+                for r in rows
+            ]
+        )
+    )
+    return (
+        sa_update(Job)
+        .where(
+            Job.id == v.c.id,
+            # Status, attempts and last_error of a finished job stay as they are
+            or_(v.c.final, Job.status.not_in(_TERMINAL_STATUSES)),
+        )
+        .values(
+            status=func.coalesce(v.c.status, Job.status),
+            result_object_key=func.coalesce(
+                v.c.result_object_key, Job.result_object_key
+            ),
+            preview_object_key=func.coalesce(
+                v.c.preview_object_key, Job.preview_object_key
+            ),
+            last_error=func.coalesce(v.c.last_error, Job.last_error),
+            # GREATEST skips NULLs, so rows without an attempt keep the count. The
+            # cast types the column when every value in the batch is a bare NULL
+            attempts=func.greatest(cast(v.c.attempts, Integer), Job.attempts),
+            updated_at=v.c.updated_at,
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _persist_rows(rows: list[dict]) -> list[Job]:
+    async with SessionLocal() as session:
+        res = await session.execute(bulk_update_query(rows))
+        jobs = list(res.scalars().all())
+        await session.commit()
+    return jobs
+
+
+class _Coalescer:
+    """
+    Per-job coalescing window. Intermediate events of a job are held for up to
+    `window` seconds from the first one, so only the latest state is written
+    and pushed; a final event flushes its job immediately.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._held: dict[uuid.UUID, list[tuple[uuid.UUID, str, dict]]] = {}
+        self._due_at: dict[uuid.UUID, float] = {}
+
+    def add(self, events: list[tuple[uuid.UUID, str, dict]], now: float) -> None:
+        for event in events:
+            job_id, event_type, _ = event
+            self._held.setdefault(job_id, []).append(event)
+            if event_type in _FINAL_EVENTS:
+                self._due_at[job_id] = now
+            else:
+                self._due_at.setdefault(job_id, now + self.window)
+
+    def take_due(self, now: float) -> list[tuple[uuid.UUID, str, dict]]:
+        due = [job_id for job_id, at in self._due_at.items() if at <= now]
+        out: list[tuple[uuid.UUID, str, dict]] = []
+        for job_id in due:
+            del self._due_at[job_id]
+            out.extend(self._held.pop(job_id))
+        return out
+
+    def discard(self, events: list[tuple[uuid.UUID, str, dict]]) -> None:
+        """Drop these exact events if still held (their messages are redelivered)."""
+        drop = {id(e) for e in events}
+        for job_id in {e[0] for e in events}:
+            held = [e for e in self._held.get(job_id, []) if id(e) not in drop]
+            if held:
+                self._held[job_id] = held
+            elif job_id in self._held:
+                del self._held[job_id]
+                del self._due_at[job_id]
+
+    def next_deadline(self) -> float | None:
+        return min(self._due_at.values(), default=None)
+
+
+async def _next_batch(
+    inbox: asyncio.Queue[AbstractIncomingMessage], flush_at: float | None
+) -> list[AbstractIncomingMessage]:
+    """Collect a batch; returns empty when `flush_at` passes with no traffic."""
+    loop = asyncio.get_running_loop()
+    if flush_at is None:
+        batch = [await inbox.get()]
+    else:
+        try:
+            batch = [
+                await asyncio.wait_for(inbox.get(), max(0.0, flush_at - loop.time()))
+            ]
+        except asyncio.TimeoutError:
+            return []
+    deadline = loop.time() + settings.EVENTS_BATCH_WINDOW_MS / 1000
+    while len(batch) < settings.EVENTS_BATCH_MAX:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(inbox.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def _process_batch(
+    batch: list[AbstractIncomingMessage], coalescer: _Coalescer
+) -> tuple[list[Job], list[dict]]:
+    """
+    Persist the job events that are due and return the updated jobs together
+    with the latest job.progress event per job, which is forwarded as is.
+    """
+    events: list[tuple[uuid.UUID, str, dict]] = []
+    progress: dict[str, dict] = {}
+    for message in batch:
+        payload = _decode(message)
+        if payload is None:
+            continue
+        if payload.get("type") == _PROGRESS_EVENT:
+            if payload.get("jobId") and payload.get("userId"):
+                progress[str(payload["jobId"])] = payload
+            continue
+        event = _parse_event(payload)
+        if event is not None:
+            events.append(event)
+
+    now = asyncio.get_running_loop().time()
+    coalescer.add(events, now)
+    due = coalescer.take_due(now)
+    jobs: list[Job] = []
+    if due:
+        try:
+            jobs = await _persist_rows(fold_events(due))
+        except Exception as e:
+            # Nothing is acked: the broker redelivers the batch once the pause is over
+            print(
+                "[api] failed to persist job events, redelivering batch",
+                {"count": len(due), "error": str(e)},
+            )
+            # This batch's events come back with the redelivery, so none may stay
+            # held; due events from earlier batches were acked already and are
+            # held again for the next write instead of being lost
+            coalescer.discard(events)
+            current = {id(e) for e in events}
+            coalescer.add([e for e in due if id(e) not in current], now)
+            await asyncio.sleep(_PERSIST_RETRY_DELAY)
+            if batch:
+                await batch[-1].nack(multiple=True, requeue=True)
+            return [], []
+    # Delivery tags are monotonic per channel; one ack covers the whole batch.
+    # Finals are always written above; held intermediate states are best effort.
+    if batch:
+        await batch[-1].ack(multiple=True)
+    return jobs, list(progress.values())
+
+
+def _user_routing_key(user_id: str) -> str:
+    return f"{settings.RMQ_EVENTS_USER_PREFIX}.{user_id}"
+
+
+async def subscribe_user(user_id: str) -> None:
+    """Start receiving job updates for a user with a live socket here."""
+    if user_id in _subscribed_users:
+        return
+    _subscribed_users.add(user_id)
+    if _user_queue is not None and _events_exchange is not None:
+        await _user_queue.bind(_events_exchange, routing_key=_user_routing_key(user_id))
+
+
+async def unsubscribe_user(user_id: str) -> None:
+    """Drop the binding once the user's last socket on this instance closed."""
+    if user_id not in _subscribed_users:
+        return
+    _subscribed_users.discard(user_id)
+    if _user_queue is not None and _events_exchange is not None:
+        await _user_queue.unbind(
+            _events_exchange, routing_key=_user_routing_key(user_id)
+        )
+
+
+async def _publish_to_user(
+    exchange: aio_pika.abc.AbstractExchange, user_id: str, message: dict
+) -> None:
+    try:
+        await exchange.publish(
+            aio_pika.Message(
+                body=json.dumps(message, default=str).encode(),
+                content_type="application/json",
+            ),
+            routing_key=_user_routing_key(user_id),
+        )
+    except Exception:
+        pass
+
+
+async def _publish_user_updates(
+    exchange: aio_pika.abc.AbstractExchange, jobs: list[Job], progress: list[dict]
+) -> None:
+    for j in jobs:
+        await _publish_to_user(
+            exchange, str(j.user_id), {"type": "job.update", "job": to_event_doc(j)}
+        )
+    for p in progress:
+        await _publish_to_user(
+            exchange,
+            str(p["userId"]),
+            {
+                "type": _PROGRESS_EVENT,
+                "userId": str(p["userId"]),
+                "jobId": str(p["jobId"]),
+                "progress": p.get("data") or {},
+            },
+        )
+
+
+async def _broadcast_locally(
+    handler: JobUpdateHandler,
+    progress_handler: ProgressHandler,
+    jobs: list[Job],
+    progress: list[dict],
+) -> None:
+    for j in jobs:
+        try:
+            # Notify handler for broadcast with full job document
+            await handler(str(j.id), to_event_doc(j))
+        except Exception:
+            pass
+    for p in progress:
+        try:
+            await progress_handler(
+                str(p["userId"]), str(p["jobId"]), p.get("data") or {}
+            )
+        except Exception:
+            pass
+
+
+async def _consume_user_updates(
+    channel: aio_pika.abc.AbstractChannel,
+    exchange: aio_pika.abc.AbstractExchange,
+    handler: JobUpdateHandler,
+    progress_handler: ProgressHandler,
+) -> None:
+    """Per-instance queue bound only to users with a socket on this instance."""
+    global _user_queue
+
+    async def on_message(message: AbstractIncomingMessage) -> None:
+        try:
+            payload = json.loads(message.body.decode())
+            if payload.get("type") == _PROGRESS_EVENT:
+                await progress_handler(
+                    payload["userId"], payload["jobId"], payload["progress"]
+                )
+            else:
+                job_doc = payload["job"]
+                await handler(str(job_doc["id"]), job_doc)
+        except Exception:
+            pass
+
+    queue = await channel.declare_queue(
+        "", exclusive=True, durable=False, auto_delete=True
+    )
+    for user_id in list(_subscribed_users):
+        await queue.bind(exchange, routing_key=_user_routing_key(user_id))
+    _user_queue = queue
+    await queue.consume(on_message, no_ack=True)
+
+
+async def _consume_events(
+    handler: JobUpdateHandler, progress_handler: ProgressHandler
+) -> None:
+    global _events_exchange
+    per_user = settings.EVENTS_PER_USER_ROUTING
     print(
         "[api] starting events consumer",
         {
             "url": settings.RABBITMQ_URL,
             "events_exchange": settings.RMQ_EVENTS_EXCHANGE,
             "events_rk": settings.RMQ_EVENTS_ROUTING_KEY,
-            "exclusive_ephemeral_queue": True,
+            "per_user_routing": per_user,
+            "batch_max": settings.EVENTS_BATCH_MAX,
+            "batch_window_ms": settings.EVENTS_BATCH_WINDOW_MS,
+            "coalesce_ms": settings.EVENTS_COALESCE_MS,
         },
     )
 
     connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
     channel = await connection.channel()
-    await channel.set_qos(prefetch_count=50)
+    # Room for the next batch to arrive while the current one is written
+    await channel.set_qos(prefetch_count=max(50, settings.EVENTS_BATCH_MAX * 2))
     exchange = await channel.declare_exchange(
         settings.RMQ_EVENTS_EXCHANGE,
         type=aio_pika.ExchangeType.TOPIC,
         durable=True,
     )
-    # Declare a per-instance, server-named exclusive queue so every API instance
-    # receives a copy of each event (pub/sub fanout via topic binding).
-    queue = await channel.declare_queue(
-        "", exclusive=True, durable=False, auto_delete=True
-    )
-    rk = settings.RMQ_EVENTS_ROUTING_KEY or "#"
-    await queue.bind(exchange, routing_key=rk)
-
-    async with queue.iterator() as queue_iter:
-        async for message in queue_iter:  # runs until connection closes
-            async with message.process():
-                try:
-                    payload = json.loads(message.body.decode())
-                except Exception:
-                    continue
-                job_id = payload.get("jobId")
-                event_type = payload.get("type")
-                data = payload.get("data", {})
-                if not job_id or not event_type:
-                    continue
-
-                # Persist basic job status updates
-
-                update: dict = {"updated_at": datetime.now(timezone.utc)}
-                if event_type == "job.processing":
-                    update["status"] = "processing"
-                elif event_type == "job.done":
-                    update["status"] = "done"
-                    if "result_object_key" in data:
-                        update["result_object_key"] = data["result_object_key"]
-                    if "preview_object_key" in data:
-                        update["preview_object_key"] = data["preview_object_key"]
-                elif event_type == "job.failed":
-                    update["status"] = "failed"
-                    if "error" in data:
-                        update["last_error"] = str(data["error"])[:500]
-                try:
-                    async with SessionLocal() as session:
-                        await session.execute(
-                            sa_update(Job).where(Job.id == job_id).values(**update)
-                        )
-                        await session.commit()
-                        # Reload full job to include necessary fields for UI
-                        res = await session.execute(select(Job).where(Job.id == job_id))
-                        j: Job | None = res.scalar_one_or_none()
-                        if j is None:
-                            continue
-                        job_doc = {
-                            "id": str(j.id),
-                            "userId": str(j.user_id),
-                            "inputAssetId": str(j.input_asset_id),
-                            "referenceAssetId": str(j.reference_asset_id)
-                            if j.reference_asset_id
-                            else None,
-                            "object_key": j.object_key,
-                            "reference_object_key": j.reference_object_key,
-                            "status": j.status,
-                            "result_object_key": j.result_object_key,
-                            "preview_object_key": j.preview_object_key,
-                            "lastError": j.last_error,
-                            "created_at": j.created_at,
-                            "updated_at": j.updated_at,
-                        }
-                    # Notify handler for broadcast with full job document
-                    await handler(job_id, job_doc)
-                except Exception:
-                    # Swallow to keep consumer running
-                    pass
-
-
-def start_events_consumer(handler: Callable[[str, dict], Awaitable[None]]) -> None:
+    _events_exchange = exchange
+
+    if per_user:
+        # One durable queue shared by all API instances: each event is persisted
+        # once, by whichever instance takes it, then re-published per user.
+        queue = await channel.declare_queue(
+            settings.RMQ_EVENTS_QUEUE or "mastering.events.api", durable=True
+        )
+        rk = settings.RMQ_EVENTS_ROUTING_KEY or "job.#"
+        await queue.bind(exchange, routing_key=rk)
+        await _consume_user_updates(
+            await connection.channel(), exchange, handler, progress_handler
+        )
+    else:
+        # Declare a per-instance, server-named exclusive queue so every API instance
+        # receives a copy of each event (pub/sub fanout via topic binding).
+        queue = await channel.declare_queue(
+            "", exclusive=True, durable=False, auto_delete=True
+        )
+        rk = settings.RMQ_EVENTS_ROUTING_KEY or "#"
+        await queue.bind(exchange, routing_key=rk)
+
+    inbox: asyncio.Queue[AbstractIncomingMessage] = asyncio.Queue()
+    await queue.consume(inbox.put)
+    coalescer = _Coalescer(settings.EVENTS_COALESCE_MS / 1000)
+    while True:
+        batch = await _next_batch(inbox, coalescer.next_deadline())
+        jobs, progress = await _process_batch(batch, coalescer)
+        if per_user:
+            await _publish_user_updates(exchange, jobs, progress)
+        else:
+            await _broadcast_locally(handler, progress_handler, jobs, progress)
+
+
+def start_events_consumer(
+    handler: JobUpdateHandler, progress_handler: ProgressHandler
+) -> None:
     global _events_task
     if _events_task is None or _events_task.done():
-        _events_task = asyncio.create_task(_consume_events(handler))
+        _events_task = asyncio.create_task(_consume_events(handler, progress_handler))
 
 
 def stop_events_consumer() -> None:
-    global _events_task
+    global _events_task, _events_exchange, _user_queue
     if _events_task and not _events_task.done():
         _events_task.cancel()
+    _events_exchange = None
+    _user_queue = None
@@ -1,18 +1,87 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from typing import Dict, Set
 
 from app.core.auth import AUTH_COOKIE_NAME, INTERNAL_JWT_ALGORITHM, INTERNAL_JWT_SECRET
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.core.settings import settings
+from app.features.realtime.events import subscribe_user, unsubscribe_user
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 from jwt import InvalidTokenError
 from jwt import decode as jwt_decode
 
 router = APIRouter()
 
-# In-memory websocket registry mapping userId to a set of active sockets
-_ws_connections: Dict[str, Set[WebSocket]] = defaultdict(set)
+
+class _ClientConnection:
+    """
+    A socket with its own bounded send queue and writer task. Pending updates
+    are keyed by job id, so a client that falls behind only ever receives the
+    latest state of each job; one that overflows the queue or stalls a send is
+    disconnected and reloads on reconnect.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self._pending: OrderedDict[str, str] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._closer: asyncio.Task | None = None
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, key: str, payload: str) -> None:
+        if self._closed:
+            return
+        full = len(self._pending) >= settings.WS_SEND_QUEUE_MAX
+        if full and key not in self._pending:
+            self._drop("send queue overflow")
+            return
+        # Replaces a stale update for the same job in place
+        self._pending[key] = payload
+        self._wakeup.set()
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._pending:
+                    _, payload = self._pending.popitem(last=False)
+                    await asyncio.wait_for(
+                        self.websocket.send_text(payload),
+                        settings.WS_SEND_TIMEOUT_SECONDS,
+                    )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._drop("send timed out")
+        except Exception:
+            self._closed = True
+
+    def _drop(self, reason: str) -> None:
+        self._closed = True
+        self._pending.clear()
+        print("[api] dropping slow websocket client", {"reason": reason})
+        self._closer = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER),
+                settings.WS_SEND_TIMEOUT_SECONDS,
+            )
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        self._closed = True
+        self._writer.cancel()
+
+
+# In-memory websocket registry mapping userId to a set of active connections
+_ws_connections: Dict[str, Set[_ClientConnection]] = defaultdict(set)
 
 
 def _get_user_id_from_websocket(websocket: WebSocket) -> str:
@@ -38,18 +107,31 @@ async def broadcast_job_update_to_user(user_id: str, job_doc: dict) -> None:
     # Require user_id to avoid leaking events
     if not user_id:
         return
-    sockets = list(_ws_connections.get(user_id, set()))
-    if not sockets:
+    conns = _ws_connections.get(user_id)
+    if not conns:
         return
+    # Serialize once; enqueueing never waits on a client's network I/O
     payload = json.dumps({"type": "job.update", "job": job_doc}, default=str)
-    for ws in sockets:
-        try:
-            await ws.send_text(payload)
-        except Exception:
-            try:
-                _ws_connections[user_id].discard(ws)
-            except Exception:
-                pass
+    key = str(job_doc.get("id") or "")
+    for conn in list(conns):
+        conn.enqueue(key, payload)
+
+
+async def broadcast_job_progress_to_user(
+    user_id: str, job_id: str, progress: dict
+) -> None:
+    if not user_id:
+        return
+    conns = _ws_connections.get(user_id)
+    if not conns:
+        return
+    payload = json.dumps(
+        {"type": "job.progress", "jobId": job_id, "progress": progress}, default=str
+    )
+    # Own coalescing slot so progress never displaces a pending job.update
+    key = f"{job_id}:progress"
+    for conn in list(conns):
+        conn.enqueue(key, payload)
 
 
 @router.websocket("/ws")
@@ -60,16 +142,24 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     except Exception:
         await websocket.close(code=4401)
         return
-    _ws_connections[user_id].add(websocket)
+    conn = _ClientConnection(websocket)
+    _ws_connections[user_id].add(conn)
+    try:
+        # Bind this instance to the user's job updates (no-op if already bound)
+        await subscribe_user(user_id)
+    except Exception:
+        pass
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
         pass
     finally:
+        conn.close()
         try:
-            _ws_connections[user_id].discard(websocket)
+            _ws_connections[user_id].discard(conn)
             if not _ws_connections[user_id]:
                 _ws_connections.pop(user_id, None)
+                await unsubscribe_user(user_id)
         except Exception:
             pass
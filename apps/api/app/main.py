@@ -4,10 +4,12 @@ import signal
 from contextlib import asynccontextmanager
 
 import app.core.entities_hub  # noqa: F401
+from app.core import rabbit
 from app.features.assets.router import router as assets_router
 from app.features.auth.router import router as auth_router
 from app.features.health.router import router as health_router
 from app.features.mastering.router import router as mastering_router
+from app.features.outbox.relay import start_outbox_relay, stop_outbox_relay
 from app.features.realtime.events import start_events_consumer, stop_events_consumer
 from app.features.realtime.websocket import router as websocket_router
 from dotenv import load_dotenv
@@ -20,7 +22,8 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     # Startup: start events consumer (DB migrations handled via Alembic)
 
-    start_events_consumer(_handle_event_broadcast)
+    start_events_consumer(_handle_event_broadcast, _handle_progress_broadcast)
+    start_outbox_relay()
 
     # Optional signal handlers (guarded to avoid clobbering server handlers like Uvicorn)
     loop = asyncio.get_running_loop()
@@ -29,6 +32,7 @@ async def lifespan(app: FastAPI):
     async def _pre_shutdown() -> None:
         try:
             stop_events_consumer()
+            stop_outbox_relay()
         except Exception:
             pass
 
@@ -56,8 +60,13 @@ async def lifespan(app: FastAPI):
                 loop.remove_signal_handler(sig)
             except Exception:
                 pass
-        # Ensure events consumer is stopped on shutdown
+        # Ensure events consumer and outbox relay are stopped on shutdown
         stop_events_consumer()
+        stop_outbox_relay()
+        try:
+            await rabbit.close()
+        except Exception:
+            pass
 
 
 app = FastAPI(title="Mastering API", version="0.1.0", lifespan=lifespan)
@@ -83,3 +92,13 @@ async def _handle_event_broadcast(job_id: str, job_doc: dict) -> None:
         await broadcast_job_update_to_user(user_id, job_doc)
     except Exception:
         pass
+
+
+async def _handle_progress_broadcast(user_id: str, job_id: str, progress: dict) -> None:
+    """Delegate job.progress forwarding to the realtime feature."""
+    try:
+        from app.features.realtime.websocket import broadcast_job_progress_to_user
+
+        await broadcast_job_progress_to_user(user_id, job_id, progress)
+    except Exception:
+        pass
@@ -0,0 +1,193 @@
+"""
+Query-plan regression check for the service queries.
+
+Seeds a large synthetic dataset into the database from DATABASE_URL, runs
+EXPLAIN on every hot query the services issue and fails when any of them
+reads `assets` or `jobs` with a sequential scan. It then executes a few job
+event batches to check that the attempts count survives batches without
+attempt numbers and that a finished job is not reopened. Everything happens
+inside one transaction that is rolled back, but point it at a local database:
+
+    cd apps/api && uv run -m scripts.explain_check
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import uuid
+
+import app.core.entities_hub  # noqa: F401
+from app.core.db import engine
+from app.core.utils.pagination import encode_cursor
+from app.features.assets.entities import Asset
+from app.features.assets.service import list_assets_query
+from app.features.mastering.entities import Job
+from app.features.mastering.service import cached_results_query, list_jobs_query
+from app.features.realtime.events import bulk_update_query, fold_events
+from sqlalchemy import Row, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql import ClauseElement
+
+USERS = 1_000
+ASSETS = 200_000
+CHECKED_TABLES = ("assets", "jobs")
+
+_SEED = (
+    """
+    INSERT INTO users (id, email, name, created_at, updated_at)
+    SELECT gen_random_uuid(), 'explain-' || g || '@example.test', NULL, now(), now()
+    FROM generate_series(1, :users) g
+    """,
+    """
+    WITH u AS (
+        SELECT array_agg(id ORDER BY email) AS ids
+        FROM users WHERE email LIKE 'explain-%@example.test'
+    )
+    INSERT INTO assets (id, user_id, s3_key, file_name, mime_type, file_size,
+                        duration_seconds, etag, status, created_at, updated_at)
+    SELECT gen_random_uuid(), u.ids[1 + g % cardinality(u.ids)],
+           'explain/' || g, 'track.wav', 'audio/wav', 1000000, 180, md5(g::text),
+           CASE WHEN g % 10 = 0 THEN 'created' ELSE 'uploaded' END,
+           now() - g * interval '1 second', now() - g * interval '1 second'
+    FROM generate_series(1, :assets) g, u
+    """,
+    """
+    INSERT INTO jobs (id, user_id, input_asset_id, reference_asset_id, object_key,
+                      reference_object_key, status, result_object_key,
+                      preview_object_key, last_error, cache_key, created_at,
+                      updated_at)
+    SELECT gen_random_uuid(), a.user_id, a.id, NULL, a.s3_key, NULL,
+           CASE abs(hashtext(a.s3_key)) % 4
+               WHEN 0 THEN 'queued' WHEN 1 THEN 'processing'
+               WHEN 2 THEN 'done' ELSE 'failed' END,
+           'jobs/' || a.id || '/master.wav', NULL, NULL, md5(a.etag),
+           a.created_at, a.updated_at
+    FROM assets a WHERE a.s3_key LIKE 'explain/%'
+    """,
+)
+
+
+def _scans(plan: dict) -> list[tuple[str, str]]:
+    """(node type, relation) for every node of a JSON plan that reads a table."""
+    out: list[tuple[str, str]] = []
+    if "Relation Name" in plan:
+        out.append((plan["Node Type"], plan["Relation Name"]))
+    for child in plan.get("Plans", []):
+        out.extend(_scans(child))
+    return out
+
+
+async def _explain(conn: AsyncConnection, stmt: ClauseElement) -> list[tuple[str, str]]:
+    compiled = stmt.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    res = await conn.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    )
+    return _scans(res.scalar_one()[0]["Plan"])
+
+
+async def _probe(conn: AsyncConnection) -> Row:
+    """One seeded job (and its owner) to parametrize the queries with."""
+    res = await conn.execute(
+        select(Job.user_id, Job.id, Job.input_asset_id, Job.cache_key, Job.created_at)
+        .join(Asset, Asset.id == Job.input_asset_id)
+        .where(Asset.s3_key == "explain/1000")
+    )
+    return res.one()
+
+
+async def _check_attempts(conn: AsyncConnection, job_id: uuid.UUID) -> int:
+    """
+    Execute event batches with and without attempt numbers against a real row;
+    a batch without any must leave the stored count untouched, and once the job
+    is done a batch without a final event must not touch it at all.
+    """
+    batches = (
+        ([(job_id, "job.processing", {"attempt": 2})], [2]),
+        ([(job_id, "job.preview_ready", {"preview_object_key": "p"})], [2]),
+        ([(job_id, "job.retrying", {"attempt": 1, "error": "e"})], [2]),
+        ([(job_id, "job.done", {"result_object_key": "r"})], [2]),
+        ([(job_id, "job.processing", {"attempt": 3})], []),
+    )
+    # The seeded status is random; start from a job that has not run yet
+    await conn.execute(update(Job).where(Job.id == job_id).values(status="queued"))
+    failed = 0
+    for events, expected in batches:
+        res = await conn.execute(bulk_update_query(fold_events(events)))
+        attempts = [j.attempts for j in res.all()]
+        ok = attempts == expected
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} attempts after {events[0][1]}: {attempts}")
+    return failed
+
+
+async def run() -> int:
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            for sql in _SEED:
+                await conn.execute(text(sql), {"users": USERS, "assets": ASSETS})
+            await conn.execute(text("ANALYZE users, assets, jobs"))
+
+            probe = await _probe(conn)
+            user_id = str(probe.user_id)
+            cursor = encode_cursor(probe.created_at, probe.id)
+            queries: dict[str, ClauseElement] = {
+                "assets.list": list_assets_query(user_id=user_id, limit=100),
+                "assets.list.cursor": list_assets_query(
+                    user_id=user_id, limit=100, cursor=cursor
+                ),
+                "assets.list.status": list_assets_query(
+                    user_id=user_id, limit=100, status_filter="uploaded"
+                ),
+                "assets.get": select(Asset).where(
+                    Asset.id == probe.input_asset_id, Asset.user_id == user_id
+                ),
+                "jobs.list": list_jobs_query(user_id=user_id, limit=100),
+                "jobs.list.cursor": list_jobs_query(
+                    user_id=user_id, limit=100, cursor=cursor
+                ),
+                "jobs.list.status": list_jobs_query(
+                    user_id=user_id, limit=100, status_filter="done"
+                ),
+                "jobs.get": select(Job).where(
+                    Job.id == probe.id, Job.user_id == user_id
+                ),
+                "jobs.cache_lookup": cached_results_query(
+                    user_id=user_id, cache_keys=[probe.cache_key]
+                ),
+                "events.bulk_update": bulk_update_query(
+                    fold_events([(probe.id, "job.processing", {"attempt": 1})])
+                ),
+                # No attempt anywhere in the batch: the VALUES column is all NULLs
+                "events.bulk_update.no_attempts": bulk_update_query(
+                    fold_events([(probe.id, "job.preview_ready", {})])
+                ),
+            }
+
+            failed = 0
+            for name, stmt in queries.items():
+                scans = await _explain(conn, stmt)
+                seq = [
+                    rel
+                    for node, rel in scans
+                    if node == "Seq Scan" and rel in CHECKED_TABLES
+                ]
+                failed += bool(seq)
+                print(
+                    f"{'FAIL' if seq else 'ok  '} {name}: "
+                    + ", ".join(f"{node} on {rel}" for node, rel in scans)
+                )
+            print(f"[explain] {len(queries) - failed}/{len(queries)} use index scans")
+            failed += await _check_attempts(conn, probe.id)
+            return 1 if failed else 0
+        finally:
+            # Nothing seeded here is ever committed
+            await trans.rollback()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
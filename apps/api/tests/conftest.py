@@ -0,0 +1,4 @@
+import os
+
+# app.core.db creates its engine on import; these tests never connect
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg://app@localhost/test")
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from app.features.realtime import events
+from app.features.realtime.events import _Coalescer, fold_events
+
+JOB = uuid.uuid4()
+
+
+def _row(batch: list[tuple[uuid.UUID, str, dict]]) -> dict:
+    rows = fold_events(batch)
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_fold_keeps_last_state_per_job() -> None:
+    other = uuid.uuid4()
+    rows = fold_events(
+        [
+            (JOB, "job.processing", {"attempt": 1}),
+            (other, "job.processing", {}),
+            (JOB, "job.done", {"result_object_key": "r", "preview_object_key": "p"}),
+        ]
+    )
+    by_id = {r["id"]: r for r in rows}
+    assert by_id[JOB]["status"] == "done"
+    assert by_id[JOB]["result_object_key"] == "r"
+    assert by_id[JOB]["final"] is True
+    assert by_id[other]["status"] == "processing"
+    assert by_id[other]["final"] is False
+
+
+@pytest.mark.parametrize("final", ["job.done", "job.failed"])
+@pytest.mark.parametrize(
+    "late", ["job.processing", "job.retrying", "job.preview_ready"]
+)
+def test_fold_never_regresses_a_terminal_status(final: str, late: str) -> None:
+    row = _row(
+        [
+            (JOB, final, {"error": "boom", "preview_object_key": "final.mp3"}),
+            (JOB, late, {"attempt": 3, "error": "late", "preview_object_key": "f"}),
+        ]
+    )
+    assert row["status"] == final.removeprefix("job.")
+    assert row["final"] is True
+    assert row["attempts"] is None
+    assert row["last_error"] != "late"
+    assert row["preview_object_key"] != "f"
+
+
+def test_fold_preview_only_row_is_not_final() -> None:
+    row = _row([(JOB, "job.preview_ready", {"preview_object_key": "fast.mp3"})])
+    assert row["status"] is None
+    assert row["preview_object_key"] == "fast.mp3"
+    assert row["final"] is False
+
+
+def test_fold_retrying_requeues_and_keeps_highest_attempt() -> None:
+    row = _row(
+        [
+            (JOB, "job.processing", {"attempt": 2}),
+            (JOB, "job.retrying", {"attempt": 1, "error": "x" * 600}),
+        ]
+    )
+    assert row["status"] == "queued"
+    assert row["attempts"] == 2
+    assert len(row["last_error"]) == 500
+    assert row["final"] is False
+
+
+def test_coalescer_holds_intermediate_events_for_the_window() -> None:
+    coalescer = _Coalescer(window=1.0)
+    event = (JOB, "job.processing", {})
+    coalescer.add([event], now=10.0)
+    assert coalescer.take_due(10.5) == []
+    assert coalescer.next_deadline() == 11.0
+    assert coalescer.take_due(11.0) == [event]
+    assert coalescer.next_deadline() is None
+
+
+def test_coalescer_final_event_flushes_job_with_held_events_in_order() -> None:
+    coalescer = _Coalescer(window=1.0)
+    held = (JOB, "job.processing", {})
+    final = (JOB, "job.done", {})
+    coalescer.add([held], now=0.0)
+    coalescer.add([final], now=0.2)
+    assert coalescer.take_due(0.2) == [held, final]
+
+
+def test_coalescer_discard_drops_only_the_given_events() -> None:
+    coalescer = _Coalescer(window=1.0)
+    first = (JOB, "job.processing", {"attempt": 1})
+    second = (JOB, "job.preview_ready", {})
+    coalescer.add([first, second], now=0.0)
+    coalescer.discard([second])
+    assert coalescer.take_due(1.0) == [first]
+
+    coalescer.add([first], now=2.0)
+    coalescer.discard([first])
+    assert coalescer.next_deadline() is None
+    assert coalescer.take_due(10.0) == []
+
+
+class _Message:
+    def __init__(self, job_id: uuid.UUID, event_type: str) -> None:
+        self.body = json.dumps({"jobId": str(job_id), "type": event_type}).encode()
+        self.acked: bool | None = None
+        self.requeued: bool | None = None
+
+    async def ack(self, multiple: bool = False) -> None:
+        self.acked = True
+
+    async def nack(self, multiple: bool = False, requeue: bool = True) -> None:
+        self.acked = False
+        self.requeued = requeue
+
+
+def _process(batch: list[_Message], coalescer: _Coalescer) -> tuple[list, list]:
+    return asyncio.run(events._process_batch(batch, coalescer))  # type: ignore
+
+
+@pytest.fixture
+def failing_persist(monkeypatch: pytest.MonkeyPatch) -> list[list[dict]]:
+    calls: list[list[dict]] = []
+
+    async def _persist_rows(rows: list[dict]) -> list:
+        calls.append(rows)
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(events, "_persist_rows", _persist_rows)
+    monkeypatch.setattr(events, "_PERSIST_RETRY_DELAY", 0.0)
+    return calls
+
+
+def test_failed_write_nacks_a_batch_with_a_final_event(
+    failing_persist: list[list[dict]],
+) -> None:
+    coalescer = _Coalescer(window=1.0)
+    batch = [_Message(JOB, "job.processing"), _Message(JOB, "job.done")]
+    jobs, progress = _process(batch, coalescer)
+    assert (jobs, progress) == ([], [])
+    assert len(failing_persist) == 1
+    assert batch[-1].acked is False and batch[-1].requeued is True
+    # The redelivery brings these events back; none may stay held
+    assert coalescer.next_deadline() is None
+
+
+def test_failed_write_keeps_due_events_of_acked_batches(
+    failing_persist: list[list[dict]],
+) -> None:
+    coalescer = _Coalescer(window=0.0)
+    earlier = (JOB, "job.processing", {"attempt": 2})
+    coalescer.add([earlier], now=0.0)
+    batch = [_Message(uuid.uuid4(), "job.failed")]
+    _process(batch, coalescer)
+    assert batch[0].acked is False
+    assert coalescer.take_due(float("inf")) == [earlier]
+
+
+def test_successful_write_acks_the_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _persist_rows(rows: list[dict]) -> list:
+        return []
+
+    monkeypatch.setattr(events, "_persist_rows", _persist_rows)
+    batch = [_Message(JOB, "job.done")]
+    _process(batch, _Coalescer(window=1.0))
+    assert batch[0].acked is True
@@ -4,6 +4,7 @@ import { useEffect, useRef, useState, useCallback } from "react";
 import type { ChangeEvent } from "react";
 import { useAuth } from "../../hooks/useAuth";
 import ABAudioPlayer from "@/app/components/AbAudioPlayer";
+import { fetchAllPages } from "@/utils/pages";
 
 export default function MasterPage() {
   const { data: user, isLoading, error, logout } = useAuth();
@@ -36,10 +37,18 @@ export default function MasterPage() {
     created_at?: string;
   };
 
+  type JobProgress = {
+    percent?: number | null;
+    etaSeconds?: number | null;
+  };
+
   const [assetsList, setAssets] = useState<ApiAsset[]>([]);
   const [jobsByAssetId, setJobsByAssetId] = useState<
     Record<string, MasteringJob>
   >({});
+  const [progressByJobId, setProgressByJobId] = useState<
+    Record<string, JobProgress>
+  >({});
   const hiddenFileInputRef = useRef<HTMLInputElement | null>(null);
 
   function onFileChange(e: ChangeEvent<HTMLInputElement>) {
@@ -158,16 +167,16 @@ export default function MasterPage() {
 
   const loadAssetsAndJobs = useCallback(async () => {
     try {
-      const [assetsRes, jobsRes] = await Promise.all([
-        fetch("/api/assets", { credentials: "include" }),
-        fetch("/api/mastering/jobs", { credentials: "include" }),
+      const [assets, jobs] = await Promise.all([
+        fetchAllPages<ApiAsset>("/api/assets", { credentials: "include" }),
+        fetchAllPages<MasteringJob>("/api/mastering/jobs", {
+          credentials: "include",
+        }),
       ]);
-      if (assetsRes.ok) {
-        const list = (await assetsRes.json()) as ApiAsset[];
-        setAssets(Array.isArray(list) ? list : []);
+      if (assets) {
+        setAssets(assets);
       }
-      if (jobsRes.ok) {
-        const jobs = (await jobsRes.json()) as MasteringJob[];
+      if (jobs) {
         const map: Record<string, MasteringJob> = {};
         for (const job of jobs) {
           const assetId = job.inputAssetId ?? job.input_asset_id;
@@ -194,6 +203,13 @@ export default function MasterPage() {
       ws.onmessage = (ev: MessageEvent) => {
         try {
           const data = JSON.parse(ev.data);
+          if (data?.type === "job.progress" && data?.jobId) {
+            const progress = (data.progress ?? {}) as JobProgress;
+            setProgressByJobId((prev) => ({
+              ...prev,
+              [data.jobId]: progress,
+            }));
+          }
           if (data?.type === "job.update" && data?.job) {
             const job = data.job as MasteringJob;
             const assetId = job.inputAssetId ?? job.input_asset_id;
@@ -281,6 +297,17 @@ export default function MasterPage() {
                 const id = getAssetId(a) || String(idx);
                 const job = jobsByAssetId[id];
                 const st = job?.status || a.status || "created";
+                const progress =
+                  st === "processing" && job?.id
+                    ? progressByJobId[job.id]
+                    : undefined;
+                const progressLabel =
+                  progress?.percent != null
+                    ? ` • ${Math.round(progress.percent)}%` +
+                      (progress.etaSeconds != null
+                        ? ` (~${Math.ceil(progress.etaSeconds)}s left)`
+                        : "")
+                    : "";
                 const base =
                   publicBaseUrl ||
                   (process.env.NEXT_PUBLIC_PUBLIC_BUCKET_URL as
@@ -307,6 +334,7 @@ export default function MasterPage() {
                         </div>
                         <div className="text-xs opacity-70">
                           format: {format} • status: {st}
+                          {progressLabel}
                         </div>
                       </div>
                       <div className="flex items-center gap-2">
@@ -0,0 +1,27 @@
+// List endpoints return one page per request and the cursor of the next page
+// in this header; it is absent on the last page.
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+const PAGE_SIZE = 100;
+
+/**
+ * Load every page of a list endpoint by following the next-page cursor.
+ * Resolves to null when any page fails, so callers keep their current state.
+ */
+export async function fetchAllPages<T>(
+  path: string,
+  init?: RequestInit
+): Promise<T[] | null> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${path}?${params}`, init);
+    if (!res.ok) return null;
+    const page = (await res.json()) as T[];
+    if (!Array.isArray(page)) return null;
+    items.push(...page);
+    cursor = res.headers.get(NEXT_CURSOR_HEADER);
+  } while (cursor);
+  return items;
+}
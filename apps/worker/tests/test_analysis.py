@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from worker.processing.analysis import SAMPLE_RATE, AnalysisReport, Analyzer
+
+
+def _tone(dbfs: float, seconds: float, freq: float = 1000.0, phase: float = 0.0) -> np.ndarray:
+    """Stereo sine with the same peak level on both channels."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    x = (10 ** (dbfs / 20) * np.sin(2 * np.pi * freq * t + phase)).astype(np.float32)
+    return np.stack([x, x], axis=1)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros((int(seconds * SAMPLE_RATE), 2), dtype=np.float32)
+
+
+def _analyze(signal: np.ndarray, block_frames: int = SAMPLE_RATE) -> AnalysisReport:
+    analyzer = Analyzer()
+    for start in range(0, len(signal), block_frames):
+        analyzer.feed(signal[start : start + block_frames])
+    return analyzer.report()
+
+
+def test_sine_at_minus_20_dbfs_reads_minus_20_lufs() -> None:
+    report = _analyze(_tone(-20.0, 10))
+    assert report.integrated_lufs == pytest.approx(-20.0, abs=0.1)
+    assert report.sample_peak_dbfs == pytest.approx(-20.0, abs=0.01)
+    assert report.rms_dbfs == pytest.approx(-23.01, abs=0.01)
+    assert report.crest_factor_db == pytest.approx(3.01, abs=0.01)
+    assert report.loudness_range_lu == pytest.approx(0.0, abs=0.1)
+    assert not report.clipping_detected
+
+
+def test_silence_is_below_the_absolute_gate() -> None:
+    report = _analyze(np.concatenate([_tone(-20.0, 10), _silence(10)]))
+    assert report.integrated_lufs == pytest.approx(-20.0, abs=0.1)
+    assert _analyze(_silence(5)).integrated_lufs is None
+
+
+def test_relative_gate_ignores_quiet_passages() -> None:
+    # EBU Tech 3341 case 3: 10 s at -36, 60 s at -23, 10 s at -36 dBFS
+    signal = np.concatenate([_tone(-36.0, 10), _tone(-23.0, 60), _tone(-36.0, 10)])
+    report = _analyze(signal)
+    assert report.integrated_lufs == pytest.approx(-23.0, abs=0.1)
+    assert report.gating_threshold_lufs is not None
+    assert report.gating_threshold_lufs < -33.0
+
+
+def test_loudness_range_of_two_levels() -> None:
+    # EBU Tech 3342 case 1: 20 s at -20 then 20 s at -30 dBFS gives 10 LU
+    report = _analyze(np.concatenate([_tone(-20.0, 20), _tone(-30.0, 20)]))
+    assert report.loudness_range_lu == pytest.approx(10.0, abs=1.0)
+
+
+def test_true_peak_finds_the_peak_between_samples() -> None:
+    # fs/4 at 45 degrees: every sample sits 3 dB below the waveform peak
+    report = _analyze(_tone(-6.0, 2, freq=SAMPLE_RATE / 4, phase=np.pi / 4))
+    assert report.sample_peak_dbfs == pytest.approx(-9.01, abs=0.05)
+    assert report.true_peak_dbtp == pytest.approx(-6.0, abs=0.5)
+
+
+def test_results_do_not_depend_on_block_boundaries() -> None:
+    signal = np.concatenate([_tone(-18.0, 4), _tone(-30.0, 4, freq=220.0)])
+    whole = _analyze(signal)
+    uneven = _analyze(signal, block_frames=12_345)
+    assert uneven.integrated_lufs == pytest.approx(whole.integrated_lufs, abs=0.01)
+    assert uneven.true_peak_dbtp == pytest.approx(whole.true_peak_dbtp, abs=0.01)
+    assert uneven.loudness_range_lu == pytest.approx(whole.loudness_range_lu, abs=0.01)
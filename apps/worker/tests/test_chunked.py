@@ -0,0 +1,26 @@
+import pytest
+
+from worker.processing.chunked import plan_segments
+
+
+def test_short_input_is_one_segment() -> None:
+    assert plan_segments(42.0, 60, 2) == [(0, None)]
+    assert plan_segments(0.0, 60, 2) == [(0, None)]
+
+
+def test_segments_overlap_and_the_last_runs_to_the_end() -> None:
+    assert plan_segments(200.0, 60, 2) == [(0, 62), (60, 62), (120, 62), (180, None)]
+
+
+def test_short_tail_is_folded_into_the_previous_segment() -> None:
+    # 181 s leaves a 1 s tail, shorter than two overlaps
+    assert plan_segments(181.0, 60, 2) == [(0, 62), (60, 62), (120, None)]
+
+
+@pytest.mark.parametrize("duration", [61.0, 119.5, 600.0, 3599.9])
+def test_segments_cover_the_whole_input(duration: float) -> None:
+    segments = plan_segments(duration, 60, 2)
+    assert segments[0][0] == 0
+    assert segments[-1][1] is None
+    for (start, length), (next_start, _) in zip(segments, segments[1:]):
+        assert length is not None and start + length > next_start
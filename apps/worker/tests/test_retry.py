@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from worker.core import retry
+from worker.core.retry import FatalJobError, attempt_of, delay_seconds, is_retryable
+from worker.processing.ffmpeg import FfmpegError
+
+
+def _s3_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "GetObject")
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        FfmpegError("master", -9, "Killed"),
+        FfmpegError("master", 1, "av_interleaved_write_frame(): No space left on device"),
+        _s3_error("SlowDown"),
+        _s3_error("InternalError"),
+        EndpointConnectionError(endpoint_url="http://s3"),
+        ConnectionResetError(),
+        asyncio.TimeoutError(),
+    ],
+    ids=lambda e: type(e).__name__,
+)
+def test_transient_errors_are_retried(error: BaseException) -> None:
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        FatalJobError("undecodable input"),
+        FfmpegError("master", 1, "Invalid data found when processing input"),
+        _s3_error("NoSuchKey"),
+        _s3_error("AccessDenied"),
+        ValueError("bad params"),
+        KeyError("object_key"),
+    ],
+    ids=lambda e: type(e).__name__,
+)
+def test_bad_input_and_unexpected_errors_are_fatal(error: BaseException) -> None:
+    assert not is_retryable(error)
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        (None, 1),
+        ({}, 1),
+        ({"attempt": 3}, 3),
+        ({"attempt": "2"}, 2),
+        ({"attempt": 0}, 1),
+        ({"attempt": "x"}, 1),
+    ],
+)
+def test_attempt_of(headers: dict | None, expected: int) -> None:
+    message = SimpleNamespace(headers=headers)
+    assert attempt_of(message) == expected  # type: ignore[arg-type]
+
+
+def test_backoff_doubles_and_is_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(retry.settings, "RETRY_BASE_DELAY_SECONDS", 10.0)
+    monkeypatch.setattr(retry.settings, "RETRY_MAX_DELAY_SECONDS", 60.0)
+    assert [delay_seconds(a) for a in range(1, 6)] == [10.0, 20.0, 40.0, 60.0, 60.0]
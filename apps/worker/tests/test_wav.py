@@ -0,0 +1,45 @@
+import struct
+
+import pytest
+
+from worker.processing.wav import patch_header_sizes
+
+
+def _streamed_head(extra_chunk: bytes = b"") -> bytes:
+    """A WAV header as ffmpeg writes it to a pipe: placeholder sizes."""
+    fmt = struct.pack("<4sIHHIIHH", b"fmt ", 16, 1, 2, 44100, 44100 * 4, 4, 16)
+    return b"RIFF" + b"\xff\xff\xff\xff" + b"WAVE" + fmt + extra_chunk + b"data" + b"\xff\xff\xff\xff"
+
+
+def test_sizes_match_the_stream_length() -> None:
+    head = _streamed_head()
+    total = len(head) + 4096
+    patched = patch_header_sizes(head, total)
+    assert len(patched) == len(head)
+    assert struct.unpack_from("<I", patched, 4)[0] == total - 8
+    assert struct.unpack_from("<I", patched, len(head) - 4)[0] == 4096
+
+
+def test_skips_chunks_before_data_including_padding() -> None:
+    # Odd-sized LIST chunk is followed by one pad byte
+    head = _streamed_head(b"LIST" + struct.pack("<I", 5) + b"abcde\x00")
+    patched = patch_header_sizes(head, len(head) + 100)
+    assert struct.unpack_from("<I", patched, len(head) - 4)[0] == 100
+    assert patched[8:-4] == head[8:-4]
+
+
+def test_sizes_saturate_above_4_gib() -> None:
+    head = _streamed_head()
+    patched = patch_header_sizes(head, 5 * 2**30)
+    assert struct.unpack_from("<I", patched, 4)[0] == 0xFFFFFFFF
+    assert struct.unpack_from("<I", patched, len(head) - 4)[0] == 0xFFFFFFFF
+
+
+@pytest.mark.parametrize(
+    "head",
+    [b"RIFX" + bytes(8), _streamed_head()[:-8]],
+    ids=["not-riff", "no-data-chunk"],
+)
+def test_rejects_unusable_headers(head: bytes) -> None:
+    with pytest.raises(ValueError):
+        patch_header_sizes(head, 1000)
@@ -0,0 +1,134 @@
+"""
+Delayed retries and dead-lettering for job messages (PLAN item 9).
+
+A job that fails with a retryable error is republished to a headers exchange
+with its next attempt number. The exchange routes it to a delay queue whose
+message TTL is the backoff for that attempt. On expiry RabbitMQ dead-letters
+it back to the jobs exchange with its original routing key, so it returns to
+the lane it came from. Delay queues have no consumers.
+
+Fatal errors, exhausted retries and undecodable messages go to a final
+dead-letter exchange and are kept there for inspection.
+"""
+
+import asyncio
+from dataclasses import dataclass
+
+import aio_pika
+import aio_pika.abc
+from botocore.exceptions import BotoCoreError, ClientError
+
+from worker.core.settings import settings
+from worker.processing.ffmpeg import FfmpegError
+
+ATTEMPT_HEADER = "attempt"
+# Matched by the delay-queue bindings (headers exchanges ignore x- prefixed names)
+_LEVEL_HEADER = "retry-level"
+
+# S3 error codes that will not go away by waiting
+_FATAL_S3_CODES = {"NoSuchKey", "NoSuchBucket", "404", "403", "AccessDenied", "InvalidObjectState"}
+# ffmpeg stderr markers of a transient host condition rather than bad input
+_TRANSIENT_FFMPEG_MARKERS = ("No space left on device", "Cannot allocate memory", "Resource temporarily unavailable")
+
+
+class FatalJobError(Exception):
+    """Failure that a retry cannot fix (e.g. an undecodable input)."""
+
+
+@dataclass(frozen=True)
+class RetryTopology:
+    retry_exchange: aio_pika.abc.AbstractExchange
+    dead_letter_exchange: aio_pika.abc.AbstractExchange
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Transient broker, network, storage and host errors are retried. Bad input
+    (ffmpeg rejecting the file, missing objects) and anything unexpected is fatal.
+    """
+    if isinstance(error, FatalJobError):
+        return False
+    if isinstance(error, FfmpegError):
+        # Killed by a signal (OOM killer, worker shutdown) or out of host resources
+        return error.returncode < 0 or any(m in error.stderr for m in _TRANSIENT_FFMPEG_MARKERS)
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") not in _FATAL_S3_CODES
+    return isinstance(error, (BotoCoreError, OSError, asyncio.TimeoutError, aio_pika.exceptions.AMQPError))
+
+
+def attempt_of(message: aio_pika.abc.AbstractIncomingMessage) -> int:
+    """1 for the first delivery, incremented on every scheduled retry."""
+    value = (message.headers or {}).get(ATTEMPT_HEADER, 1)
+    if not isinstance(value, (int, str, bytes)):
+        return 1
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        return 1
+
+
+def delay_seconds(attempt: int) -> float:
+    """Backoff before the delivery after `attempt`: base * 2^(attempt-1), capped."""
+    return min(settings.RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1), settings.RETRY_MAX_DELAY_SECONDS)
+
+
+def _delay_queue_name(delay_ms: int) -> str:
+    # TTL is part of the name so changing the backoff never redeclares a queue with new arguments
+    return f"{settings.RMQ_QUEUE}.retry.{delay_ms}ms"
+
+
+async def declare(channel: aio_pika.abc.AbstractChannel) -> RetryTopology:
+    """Declare the retry exchange, one delay queue per backoff step and the final dead-letter queue."""
+    retry_exchange = await channel.declare_exchange(
+        settings.RMQ_RETRY_EXCHANGE, type=aio_pika.ExchangeType.HEADERS, durable=True
+    )
+    for attempt in range(1, max(settings.RETRY_MAX_ATTEMPTS, 1)):
+        delay_ms = round(delay_seconds(attempt) * 1000)
+        queue = await channel.declare_queue(
+            _delay_queue_name(delay_ms),
+            durable=True,
+            arguments={
+                "x-message-ttl": delay_ms,
+                # No dead-letter routing key: the message keeps its lane's key
+                "x-dead-letter-exchange": settings.RMQ_EXCHANGE,
+            },
+        )
+        await queue.bind(retry_exchange, arguments={"x-match": "all", _LEVEL_HEADER: str(attempt)})
+
+    dead_letter_exchange = await channel.declare_exchange(
+        settings.RMQ_DEAD_LETTER_EXCHANGE, type=aio_pika.ExchangeType.FANOUT, durable=True
+    )
+    dead_letter_queue = await channel.declare_queue(settings.RMQ_DEAD_LETTER_QUEUE, durable=True)
+    await dead_letter_queue.bind(dead_letter_exchange)
+    return RetryTopology(retry_exchange=retry_exchange, dead_letter_exchange=dead_letter_exchange)
+
+
+def _copy(message: aio_pika.abc.AbstractIncomingMessage, headers: dict) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=message.body,
+        content_type=message.content_type,
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        correlation_id=message.correlation_id,
+        headers={**(message.headers or {}), **headers},
+    )
+
+
+async def schedule(
+    topology: RetryTopology, message: aio_pika.abc.AbstractIncomingMessage, attempt: int
+) -> float:
+    """Republish the message for a delayed retry after `attempt`; returns the delay in seconds."""
+    await topology.retry_exchange.publish(
+        _copy(message, {ATTEMPT_HEADER: attempt + 1, _LEVEL_HEADER: str(attempt)}),
+        routing_key=message.routing_key or settings.RMQ_ROUTING_KEY,
+    )
+    return delay_seconds(attempt)
+
+
+async def dead_letter(
+    topology: RetryTopology, message: aio_pika.abc.AbstractIncomingMessage, reason: str
+) -> None:
+    """Park the message on the final dead-letter queue with the reason it was given up on."""
+    await topology.dead_letter_exchange.publish(
+        _copy(message, {"error": reason[:500], "source-routing-key": message.routing_key or ""}),
+        routing_key="",
+    )
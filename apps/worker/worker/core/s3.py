@@ -1,10 +1,55 @@
-import boto3
+import asyncio
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
 from worker.core.settings import settings
 
-s3 = boto3.client(
-    "s3",
-    endpoint_url=settings.S3_ENDPOINT,
-    aws_access_key_id=settings.S3_ACCESS_KEY,
-    aws_secret_access_key=settings.S3_SECRET_KEY,
-    region_name=settings.S3_REGION,
-)
+if TYPE_CHECKING:
+    # Stubs from the dev extra (types-aiobotocore[s3]); not needed at runtime
+    from types_aiobotocore_s3 import S3Client
+
+_client: "S3Client | None" = None
+_stack: AsyncExitStack | None = None
+
+_init_lock = asyncio.Lock()
+
+
+async def get_client() -> "S3Client":
+    """
+    Return the shared async S3 client. Lazily created once per process so every job
+    reuses the same HTTP connection pool. Safe for concurrent calls.
+    """
+    global _client, _stack
+
+    if _client is not None:
+        return _client
+
+    async with _init_lock:
+        if _client is not None:
+            return _client
+
+        stack = AsyncExitStack()
+        _client = await stack.enter_async_context(
+            get_session().create_client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT or None,
+                aws_access_key_id=settings.S3_ACCESS_KEY,
+                aws_secret_access_key=settings.S3_SECRET_KEY,
+                region_name=settings.S3_REGION,
+                config=AioConfig(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS),
+            )
+        )
+        _stack = stack
+        return _client
+
+
+async def close() -> None:
+    """Close the shared client and its connection pool."""
+    global _client, _stack
+    if _stack is not None:
+        await _stack.aclose()
+    _stack = None
+    _client = None
@@ -0,0 +1,53 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Mapping
+
+from worker.core.settings import settings
+
+
+class ProcessScheduler:
+    """
+    Cap the number of concurrently running ffmpeg processes on this worker and
+    hand each one an explicit thread budget so the host is filled but not
+    oversubscribed.
+    """
+
+    def __init__(self, max_processes: int, threads_per_process: int) -> None:
+        self.max_processes = max_processes
+        self.threads_per_process = threads_per_process
+        self._slots = asyncio.Semaphore(max_processes)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[int]:
+        """Hold one process slot; yields the thread budget for that process."""
+        async with self._slots:
+            yield self.threads_per_process
+
+    def prefetch_count(self) -> int:
+        """AMQP prefetch matching the slot count plus optional look-ahead."""
+        return self.max_processes + max(settings.WORKER_PREFETCH_EXTRA, 0)
+
+    def lane_prefetch(self, weights: Mapping[str, int]) -> dict[str, int]:
+        """
+        Split the prefetch across lanes by weight. Lanes with weight <= 0 are left
+        out; every other lane gets at least one message.
+        """
+        active = {lane: w for lane, w in weights.items() if w > 0}
+        if not active:
+            return {}
+        total = self.prefetch_count()
+        weight_sum = sum(active.values())
+        return {lane: max(1, round(total * w / weight_sum)) for lane, w in active.items()}
+
+
+def _build_scheduler() -> ProcessScheduler:
+    cores = os.cpu_count() or 1
+    max_processes = settings.WORKER_CONCURRENCY if settings.WORKER_CONCURRENCY > 0 else cores
+    threads = settings.FFMPEG_THREADS
+    if threads <= 0:
+        threads = max(cores // max_processes, 1)
+    return ProcessScheduler(max_processes=max_processes, threads_per_process=threads)
+
+
+scheduler = _build_scheduler()
@@ -8,6 +8,17 @@ class Settings(BaseSettings):
     RMQ_EXCHANGE_TYPE: str = ""
     RMQ_QUEUE: str = ""
     RMQ_ROUTING_KEY: str = ""
+    # Lane for long inputs (the API routes by asset duration)
+    RMQ_LONG_QUEUE: str = "mastering.process.long"
+    RMQ_LONG_ROUTING_KEY: str = "process.long"
+    # Delayed retries (TTL queues behind a headers exchange) and the final dead letters
+    RMQ_RETRY_EXCHANGE: str = "mastering.jobs.retry"
+    RMQ_DEAD_LETTER_EXCHANGE: str = "mastering.jobs.dead"
+    RMQ_DEAD_LETTER_QUEUE: str = "mastering.process.dead"
+    # Deliveries per job including the first; backoff doubles from the base delay
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY_SECONDS: float = 10.0
+    RETRY_MAX_DELAY_SECONDS: float = 600.0
 
     # Events (worker -> API)
     RMQ_EVENTS_EXCHANGE: str = ""
@@ -15,6 +26,11 @@ class Settings(BaseSettings):
     RMQ_EVENTS_ROUTING_KEY_PROCESSING: str = ""
     RMQ_EVENTS_ROUTING_KEY_DONE: str = ""
     RMQ_EVENTS_ROUTING_KEY_FAILED: str = ""
+    RMQ_EVENTS_ROUTING_KEY_PREVIEW_READY: str = "job.preview_ready"
+    RMQ_EVENTS_ROUTING_KEY_PROGRESS: str = "job.progress"
+    RMQ_EVENTS_ROUTING_KEY_RETRYING: str = "job.retrying"
+    # Minimum spacing of job.progress events per job
+    PROGRESS_INTERVAL_SECONDS: float = 1.0
 
     # S3/MinIO
     S3_ENDPOINT: str = ""
@@ -22,6 +38,47 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = ""
     S3_SECRET_KEY: str = ""
     S3_BUCKET: str = ""
+    S3_STREAM_CHUNK_BYTES: int = 1024 * 1024
+    # Shared async client: HTTP pool size and per-transfer concurrency
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_TRANSFER_CONCURRENCY: int = 8
+    # Objects above the threshold move as concurrent parts / ranged GETs
+    # (parts must be >= 5 MiB except the last one)
+    S3_MULTIPART_THRESHOLD_BYTES: int = 16 * 1024 * 1024
+    S3_MULTIPART_PART_BYTES: int = 8 * 1024 * 1024
+
+    # Concurrency
+    # Max concurrent ffmpeg processes per worker; 0 = number of CPU cores
+    WORKER_CONCURRENCY: int = 0
+    # Threads given to each ffmpeg process; 0 = cores / WORKER_CONCURRENCY
+    FFMPEG_THREADS: int = 0
+    # Extra messages to prefetch beyond the process slots (downloads can overlap)
+    WORKER_PREFETCH_EXTRA: int = 0
+    # Share of the prefetch given to each lane; every consumed lane keeps at least
+    # one message in flight so long jobs are never starved. 0 = do not consume the lane
+    WORKER_SHORT_LANE_WEIGHT: int = 3
+    WORKER_LONG_LANE_WEIGHT: int = 1
+
+    # Processing
+    # Decode the input once and render master + preview from a single ffmpeg graph
+    FFMPEG_SINGLE_PASS: bool = True
+    # Measure once (cached per asset ETag) and apply loudnorm in linear mode
+    LOUDNORM_TWO_PASS: bool = True
+    # Pipe the S3 object straight into ffmpeg stdin instead of downloading it first
+    STREAM_INPUT: bool = False
+    # Upload master.wav from ffmpeg stdout while encoding (single-pass mode only)
+    STREAM_OUTPUT: bool = False
+    # Publish a quick preview of the raw input while the full master renders
+    FAST_PREVIEW: bool = True
+    # Decode once to a memory-mapped float32 file shared by all stages of a job
+    PCM_BUFFER: bool = True
+    # Write analysis.json (LUFS, LRA, true peak, bands…); also replaces the loudnorm analysis pass
+    ANALYSIS_ENABLED: bool = True
+    # Split long inputs into overlapping segments mastered in parallel processes
+    CHUNKED_MASTERING: bool = True
+    CHUNKED_MIN_SECONDS: int = 15 * 60
+    CHUNKED_SEGMENT_SECONDS: int = 5 * 60
+    CHUNKED_OVERLAP_SECONDS: int = 2
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -10,7 +10,12 @@ from typing import Awaitable, Callable, AsyncIterator
 import aio_pika
 import aio_pika.abc
 
+from worker.core import retry, s3
+from worker.core.scheduler import scheduler
 from worker.core.settings import settings
+from worker.processing import analysis, chunked, loudnorm, pcm, preview, reference, wav
+from worker.processing.ffmpeg import FfmpegInput, ProgressCallback, StdoutSink, probe_duration, run_ffmpeg
+from worker.processing.progress import ProgressReporter
 from worker.providers import files as files_provider
 
 StopCallback = Callable[[], Awaitable[None]]
@@ -42,21 +47,20 @@ async def _lifecycle() -> AsyncIterator[StopCallback]:
         pass
 
 
- 
+PREVIEW_DURATION_SECONDS = 60
 
 
-async def _run_ffmpeg_normalize(input_path: str, output_path: str) -> None:
+async def _run_ffmpeg_normalize(
+    source: FfmpegInput, output_path: str, loudness_filter: str, progress: ProgressCallback | None = None
+) -> None:
     """
-    Apply basic loudness normalization using ffmpeg loudnorm filter.
-    Target: I=-14 LUFS, TP=-1.5 dB, LRA=11.
+    Apply loudness normalization using the given ffmpeg loudnorm filter.
     """
-    process = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-y",
-        "-i",
-        input_path,
+    await run_ffmpeg(
+        "loudnorm",
+        *source.args(),
         "-af",
-        "loudnorm=I=-14:TP=-1.5:LRA=11",
+        loudness_filter,
         "-ar",
         "44100",
         "-ac",
@@ -64,21 +68,19 @@ async def _run_ffmpeg_normalize(input_path: str, output_path: str) -> None:
         "-c:a",
         "pcm_s16le",
         output_path,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+        stdin=source.stdin(),
+        progress=progress,
     )
-    _, stderr = await process.communicate()
-    if process.returncode != 0:
-        raise RuntimeError(f"ffmpeg loudnorm failed: {stderr.decode(errors='ignore')[:500]}")
 
 
-async def _run_ffmpeg_preview(input_path: str, output_path: str, duration_seconds: int = 60) -> None:
+async def _run_ffmpeg_preview(
+    input_path: str, output_path: str, duration_seconds: int = PREVIEW_DURATION_SECONDS
+) -> None:
     """
     Create an mp3 preview clip of the mastered audio.
     """
-    process = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-y",
+    await run_ffmpeg(
+        "preview",
         "-t",
         str(duration_seconds),
         "-i",
@@ -89,12 +91,55 @@ async def _run_ffmpeg_preview(input_path: str, output_path: str, duration_second
         "-b:a",
         "192k",
         output_path,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
     )
-    _, stderr = await process.communicate()
-    if process.returncode != 0:
-        raise RuntimeError(f"ffmpeg preview failed: {stderr.decode(errors='ignore')[:500]}")
+
+
+async def _run_ffmpeg_master_and_preview(
+    source: FfmpegInput,
+    master_path: str,
+    preview_path: str,
+    loudness_filter: str,
+    duration_seconds: int = PREVIEW_DURATION_SECONDS,
+    stdout: StdoutSink | None = None,
+    progress: ProgressCallback | None = None,
+) -> None:
+    """
+    Decode the input once and render the master and the mp3 preview from one graph.
+
+    The normalized stream is split with `asplit`: one branch goes to the PCM
+    master, the other is trimmed to the preview length and encoded to mp3.
+    Pass master_path="pipe:1" together with `stdout` to stream the master.
+    """
+    filter_graph = (
+        f"[0:a]{loudness_filter},"
+        "aformat=sample_rates=44100:channel_layouts=stereo,"
+        "asplit=2[master][preview_full];"
+        f"[preview_full]atrim=duration={duration_seconds},asetpts=PTS-STARTPTS[preview]"
+    )
+    await run_ffmpeg(
+        "master+preview",
+        *source.args(),
+        "-filter_complex",
+        filter_graph,
+        "-map",
+        "[master]",
+        "-c:a",
+        "pcm_s16le",
+        "-f",
+        "wav",
+        master_path,
+        "-map",
+        "[preview]",
+        "-vn",
+        "-c:a",
+        "libmp3lame",
+        "-b:a",
+        "192k",
+        preview_path,
+        stdin=source.stdin(),
+        stdout=stdout,
+        progress=progress,
+    )
 
 
 async def _publish_event(exchange: aio_pika.abc.AbstractExchange, routing_key: str, payload: dict) -> None:
@@ -109,19 +154,176 @@ async def _publish_event(exchange: aio_pika.abc.AbstractExchange, routing_key: s
     )
 
 
-async def handle_message(events_exchange: aio_pika.abc.AbstractExchange, msg: aio_pika.abc.AbstractIncomingMessage):
-    async with msg.process():
+async def _publish_progress(
+    events_exchange: aio_pika.abc.AbstractExchange, job_id: str, user_id: str | None, data: dict
+) -> None:
+    await _publish_event(
+        events_exchange,
+        settings.RMQ_EVENTS_ROUTING_KEY_PROGRESS,
+        {
+            "type": "job.progress",
+            "occurredAt": datetime.now(timezone.utc).isoformat(),
+            "jobId": job_id,
+            "userId": user_id,
+            "data": data,
+            "version": 1,
+        },
+    )
+
+
+async def _render_master(
+    source: FfmpegInput,
+    loudness_filter: str,
+    tmpdir: str,
+    result_key: str,
+    preview_key: str,
+    progress: ProgressCallback | None = None,
+) -> None:
+    """Render master.wav and preview.mp3 and upload both."""
+    mastered_path = os.path.join(tmpdir, "master.wav")
+    preview_path = os.path.join(tmpdir, "preview.mp3")
+
+    if settings.FFMPEG_SINGLE_PASS and settings.STREAM_OUTPUT:
+        async with files_provider.multipart_upload(
+            result_key, "audio/wav", patch_head=wav.patch_header_sizes
+        ) as upload:
+            await _run_ffmpeg_master_and_preview(
+                source, "pipe:1", preview_path, loudness_filter, stdout=upload.consume, progress=progress
+            )
+    else:
+        if settings.FFMPEG_SINGLE_PASS:
+            await _run_ffmpeg_master_and_preview(
+                source, mastered_path, preview_path, loudness_filter, progress=progress
+            )
+        else:
+            await _run_ffmpeg_normalize(source, mastered_path, loudness_filter, progress=progress)
+            await _run_ffmpeg_preview(mastered_path, preview_path)
+        await files_provider.upload_file(mastered_path, result_key, "audio/wav")
+    await files_provider.upload_file(preview_path, preview_key, "audio/mpeg")
+
+
+async def _render_master_chunked(
+    source: FfmpegInput,
+    measurement: loudnorm.LoudnormMeasurement | None,
+    target: loudnorm.LoudnessTarget,
+    duration: float,
+    tmpdir: str,
+    result_key: str,
+    preview_key: str,
+    reporter: ProgressReporter | None = None,
+) -> None:
+    """Render a long input in parallel segments, then derive the preview from the master."""
+    mastered_path = os.path.join(tmpdir, "master.wav")
+    preview_path = os.path.join(tmpdir, "preview.mp3")
+
+    await chunked.render_master(
+        source,
+        mastered_path,
+        duration,
+        measurement,
+        target,
+        tmpdir,
+        segment_seconds=settings.CHUNKED_SEGMENT_SECONDS,
+        overlap_seconds=settings.CHUNKED_OVERLAP_SECONDS,
+        progress=reporter.track if reporter is not None else None,
+    )
+    await _run_ffmpeg_preview(mastered_path, preview_path)
+    await files_provider.upload_file(mastered_path, result_key, "audio/wav")
+    await files_provider.upload_file(preview_path, preview_key, "audio/mpeg")
+
+
+async def _publish_analysis(
+    job_id: str,
+    source: FfmpegInput,
+    target: loudnorm.LoudnessTarget,
+    pcm_buffer: pcm.PcmBuffer | None = None,
+) -> loudnorm.LoudnormMeasurement | None:
+    """
+    Analyze the input, store analysis.json next to the master and return the
+    loudness figures in loudnorm form. Failures are logged only.
+    """
+    try:
+        report = (
+            await analysis.analyze_pcm(pcm_buffer)
+            if pcm_buffer is not None
+            else await analysis.analyze(source)
+        )
+        await files_provider.put_bytes(report.to_json(), f"jobs/{job_id}/analysis.json", "application/json")
+        return report.loudnorm_measurement(target)
+    except Exception as e:
+        print(f"[worker] analysis failed for job {job_id}: {e}")
+        return None
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def _cache_reference_profile(job_id: str, object_key: str, etag: str | None, tmpdir: str) -> None:
+    """
+    Make sure the job's reference profile is cached for its reference asset and
+    ETag, so jobs sharing the reference never decode it again; a cached profile
+    is only HEADed. Failures are logged only.
+    """
+    try:
+        await reference.ensure_profile(object_key, etag, tmpdir)
+    except Exception as e:
+        print(f"[worker] reference analysis failed for job {job_id}: {e}")
+
+
+async def _publish_fast_preview(
+    events_exchange: aio_pika.abc.AbstractExchange,
+    job_id: str,
+    source: FfmpegInput,
+    target: loudnorm.LoudnessTarget,
+    tmpdir: str,
+) -> None:
+    """
+    Encode a quick preview from the raw input, upload it and announce it with
+    job.preview_ready. Failures are logged only; the full master is what counts.
+    """
+    fast_preview_key = f"jobs/{job_id}/preview-fast.mp3"
+    fast_preview_path = os.path.join(tmpdir, "preview-fast.mp3")
+    try:
+        await preview.render_fast_preview(source, fast_preview_path, target, PREVIEW_DURATION_SECONDS)
+        await files_provider.upload_file(fast_preview_path, fast_preview_key, "audio/mpeg")
+        await _publish_event(
+            events_exchange,
+            settings.RMQ_EVENTS_ROUTING_KEY_PREVIEW_READY,
+            {
+                "type": "job.preview_ready",
+                "occurredAt": datetime.now(timezone.utc).isoformat(),
+                "jobId": job_id,
+                "data": {"preview_object_key": fast_preview_key},
+                "version": 1,
+            },
+        )
+    except Exception as e:
+        print(f"[worker] fast preview failed for job {job_id}: {e}")
+
+
+async def handle_message(
+    events_exchange: aio_pika.abc.AbstractExchange,
+    retries: retry.RetryTopology,
+    msg: aio_pika.abc.AbstractIncomingMessage,
+):
+    # Requeue only if the handler itself breaks (e.g. the broker drops mid-publish)
+    async with msg.process(requeue=True):
         try:
             payload = json.loads(msg.body.decode())
         except Exception:
+            await retry.dead_letter(retries, msg, "undecodable job message")
             return
 
         job_id = payload.get("jobId")
         object_key = payload.get("object_key")
         if not job_id or not object_key:
+            await retry.dead_letter(retries, msg, "job message without jobId or object_key")
             return
 
-        print(f"[worker] start job {job_id}")
+        attempt = retry.attempt_of(msg)
+        print(f"[worker] start job {job_id} (attempt {attempt})")
 
         # Notify processing
         await _publish_event(
@@ -131,7 +333,7 @@ async def handle_message(events_exchange: aio_pika.abc.AbstractExchange, msg: ai
                 "type": "job.processing",
                 "occurredAt": datetime.now(timezone.utc).isoformat(),
                 "jobId": job_id,
-                "data": {},
+                "data": {"attempt": attempt},
                 "version": 1,
             },
         )
@@ -139,17 +341,93 @@ async def handle_message(events_exchange: aio_pika.abc.AbstractExchange, msg: ai
         try:
             result_key = f"jobs/{job_id}/master.wav"
             preview_key = f"jobs/{job_id}/preview.mp3"
+            target = loudnorm.LoudnessTarget.from_params(payload.get("params") or {})
 
             with tempfile.TemporaryDirectory() as tmpdir:
                 input_path = os.path.join(tmpdir, "input")
-                mastered_path = os.path.join(tmpdir, "master.wav")
-                preview_path = os.path.join(tmpdir, "preview.mp3")
-
-                await files_provider.download_file(object_key, input_path)
-                await _run_ffmpeg_normalize(input_path, mastered_path)
-                await _run_ffmpeg_preview(mastered_path, preview_path)
-                await files_provider.upload_file(mastered_path, result_key, "audio/wav")
-                await files_provider.upload_file(preview_path, preview_key, "audio/mpeg")
+                # Side tasks settle before the temp dir goes away and before job.done is sent
+                side_tasks: list[asyncio.Task] = []
+                if payload.get("reference_object_key"):
+                    side_tasks.append(
+                        asyncio.create_task(
+                            _cache_reference_profile(
+                                job_id, payload["reference_object_key"], payload.get("reference_etag"), tmpdir
+                            )
+                        )
+                    )
+                try:
+                    if settings.STREAM_INPUT:
+                        source = FfmpegInput(object_key=object_key)
+                    else:
+                        await files_provider.download_file(object_key, input_path)
+                        source = FfmpegInput(path=input_path)
+
+                    # Instant preview from the raw input; runs alongside the decode and the full master
+                    fast_preview: asyncio.Task | None = None
+                    if settings.FAST_PREVIEW:
+                        fast_preview = asyncio.create_task(
+                            _publish_fast_preview(events_exchange, job_id, source, target, tmpdir)
+                        )
+                        side_tasks.append(fast_preview)
+
+                    # Decode once; every later stage reads the memory-mapped PCM
+                    pcm_buffer: pcm.PcmBuffer | None = None
+                    if settings.PCM_BUFFER:
+                        pcm_buffer = await pcm.decode(source, tmpdir)
+                        source = pcm_buffer.as_input()
+                        # The fast preview may still be reading the original
+                        if fast_preview is None or fast_preview.done():
+                            _remove_file(input_path)
+                        else:
+                            fast_preview.add_done_callback(lambda _: _remove_file(input_path))
+                    measured = (
+                        await _publish_analysis(job_id, source, target, pcm_buffer)
+                        if settings.ANALYSIS_ENABLED
+                        else None
+                    )
+                    duration: float | None = None
+                    if pcm_buffer is not None:
+                        duration = pcm_buffer.duration
+                    elif source.path:
+                        duration = await probe_duration(source.path)
+                    reporter = ProgressReporter(
+                        lambda data: _publish_progress(events_exchange, job_id, payload.get("userId"), data),
+                        duration,
+                        settings.PROGRESS_INTERVAL_SECONDS,
+                    )
+                    # Long local inputs are split across processes; seeking needs a file
+                    if (
+                        settings.CHUNKED_MASTERING
+                        and source.path
+                        and duration is not None
+                        and duration >= settings.CHUNKED_MIN_SECONDS
+                    ):
+                        reporter.stage = "segments"
+                        measurement = await loudnorm.measure_cached(
+                            source, object_key, payload.get("etag"), target, measured
+                        )
+                        await _render_master_chunked(
+                            source, measurement, target, duration, tmpdir, result_key, preview_key, reporter
+                        )
+                    else:
+                        loudness_filter = await loudnorm.build_filter(
+                            source,
+                            object_key,
+                            payload.get("etag"),
+                            target,
+                            two_pass=settings.LOUDNORM_TWO_PASS,
+                            measured=measured,
+                        )
+                        await _render_master(
+                            source, loudness_filter, tmpdir, result_key, preview_key, reporter.track()
+                        )
+                    print(f"[worker] rendered job {job_id}", reporter.snapshot())
+                except BaseException:
+                    for task in side_tasks:
+                        task.cancel()
+                    raise
+                finally:
+                    await asyncio.gather(*side_tasks, return_exceptions=True)
 
             # Notify done
             await _publish_event(
@@ -168,7 +446,24 @@ async def handle_message(events_exchange: aio_pika.abc.AbstractExchange, msg: ai
             )
             print(f"[worker] done job {job_id}")
         except Exception as e:
-            # Notify failed
+            if retry.is_retryable(e) and attempt < settings.RETRY_MAX_ATTEMPTS:
+                delay = await retry.schedule(retries, msg, attempt)
+                await _publish_event(
+                    events_exchange,
+                    settings.RMQ_EVENTS_ROUTING_KEY_RETRYING,
+                    {
+                        "type": "job.retrying",
+                        "occurredAt": datetime.now(timezone.utc).isoformat(),
+                        "jobId": job_id,
+                        "data": {"error": str(e)[:500], "attempt": attempt, "retryInSeconds": delay},
+                        "version": 1,
+                    },
+                )
+                print(f"[worker] retrying job {job_id} in {delay}s after attempt {attempt}: {e}")
+                return
+
+            # Fatal or out of attempts: park the message and notify failed
+            await retry.dead_letter(retries, msg, str(e))
             await _publish_event(
                 events_exchange,
                 settings.RMQ_EVENTS_ROUTING_KEY_FAILED,
@@ -176,11 +471,11 @@ async def handle_message(events_exchange: aio_pika.abc.AbstractExchange, msg: ai
                     "type": "job.failed",
                     "occurredAt": datetime.now(timezone.utc).isoformat(),
                     "jobId": job_id,
-                    "data": {"error": str(e)[:500]},
+                    "data": {"error": str(e)[:500], "attempt": attempt},
                     "version": 1,
                 },
             )
-            print(f"[worker] failed job {job_id}: {e}")
+            print(f"[worker] failed job {job_id} after attempt {attempt}: {e}")
 
 
 async def main() -> None:
@@ -188,16 +483,6 @@ async def main() -> None:
         connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
         try:
             channel = await connection.channel()
-            await channel.set_qos(prefetch_count=5)
-
-            # Jobs input (direct)
-            exchange = await channel.declare_exchange(
-                settings.RMQ_EXCHANGE,
-                type=aio_pika.ExchangeType.DIRECT,
-                durable=True,
-            )
-            queue = await channel.declare_queue(settings.RMQ_QUEUE, durable=True)
-            await queue.bind(exchange, routing_key=settings.RMQ_ROUTING_KEY)
 
             # Events output (topic)
             events_exchange = await channel.declare_exchange(
@@ -205,13 +490,41 @@ async def main() -> None:
                 type=aio_pika.ExchangeType.TOPIC,
                 durable=True,
             )
-
-            await queue.consume(lambda m: handle_message(events_exchange, m))
-            print("[worker] waiting for messages… (Ctrl+C to stop)")
+            retries = await retry.declare(channel)
+
+            # Jobs input (direct), one channel per lane so each has its own prefetch
+            lanes = {
+                settings.RMQ_QUEUE: (settings.RMQ_ROUTING_KEY, settings.WORKER_SHORT_LANE_WEIGHT),
+                settings.RMQ_LONG_QUEUE: (settings.RMQ_LONG_ROUTING_KEY, settings.WORKER_LONG_LANE_WEIGHT),
+            }
+            prefetch = scheduler.lane_prefetch({name: weight for name, (_, weight) in lanes.items()})
+            if not prefetch:
+                raise RuntimeError("no job lane enabled; set a positive lane weight")
+            for queue_name, prefetch_count in prefetch.items():
+                lane_channel = await connection.channel()
+                await lane_channel.set_qos(prefetch_count=prefetch_count)
+                exchange = await lane_channel.declare_exchange(
+                    settings.RMQ_EXCHANGE,
+                    type=aio_pika.ExchangeType.DIRECT,
+                    durable=True,
+                )
+                queue = await lane_channel.declare_queue(queue_name, durable=True)
+                await queue.bind(exchange, routing_key=lanes[queue_name][0])
+                await queue.consume(lambda m: handle_message(events_exchange, retries, m))
+
+            print(
+                "[worker] waiting for messages… (Ctrl+C to stop)",
+                {
+                    "processes": scheduler.max_processes,
+                    "threads_per_process": scheduler.threads_per_process,
+                    "lane_prefetch": prefetch,
+                },
+            )
 
             await wait_stop()
         finally:
             await connection.close()
+            await s3.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+"""
+Streaming audio analysis over decoded PCM (PLAN stage 5).
+
+Blocks of float32 PCM (from the job's memory-mapped PCM buffer, or decoded by
+ffmpeg on a pipe) are fed to `Analyzer`, which keeps only running state (filter memories, per-100 ms
+energies, band accumulators), so memory stays bounded by the block size plus
+a few floats per 100 ms of audio.
+
+- Integrated loudness and gating threshold: ITU-R BS.1770-4 (K-weighting,
+  400 ms blocks with 75% overlap, -70 LUFS absolute / -10 LU relative gates).
+- Loudness range: EBU Tech 3342 (3 s short-term, -20 LU relative gate, P95 - P10).
+- True peak: 4x polyphase oversampling (BS.1770-4 Annex 2).
+- Crest factor, octave-band energy distribution and clipping counts.
+"""
+
+import asyncio
+import json
+import math
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+from scipy.signal import firwin, sosfilt, upfirdn
+
+from worker.processing.ffmpeg import FfmpegInput, run_ffmpeg
+from worker.processing.loudnorm import LoudnessTarget, LoudnormMeasurement
+from worker.processing.pcm import PcmBuffer
+
+REPORT_VERSION = 1
+
+# Rate used when ffmpeg decodes for analysis on a pipe
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+TRUE_PEAK_OVERSAMPLING = 4
+TRUE_PEAK_TAPS = 48
+# Interpolation low-pass at the original Nyquist (cutoff relative to the oversampled Nyquist)
+TRUE_PEAK_FIR = firwin(TRUE_PEAK_TAPS, 1.0 / TRUE_PEAK_OVERSAMPLING) * TRUE_PEAK_OVERSAMPLING
+TRUE_PEAK_CONTEXT = math.ceil(TRUE_PEAK_TAPS / TRUE_PEAK_OVERSAMPLING)
+
+OCTAVE_CENTERS_HZ = (31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+CLIP_LEVEL = 0.9999
+# More clipped samples than this fraction flags the input as clipping
+CLIP_RATIO_THRESHOLD = 1e-5
+
+
+def k_weighting_sos(sample_rate: int) -> np.ndarray:
+    """
+    BS.1770-4 K-weighting (high-shelf pre-filter, then the RLB high-pass) as
+    second-order sections for any sample rate. Matches the published 48 kHz
+    coefficients.
+    """
+    # Stage 1: high shelf
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh**0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0,
+        2 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        1.0,
+        2 * (k * k - 1) / a0,
+        (1 - k / q + k * k) / a0,
+    ]
+    # Stage 2: RLB high-pass
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    high_pass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, high_pass])
+
+
+def _to_db(value: float, reference: float = 1.0) -> float:
+    return 20 * math.log10(value / reference) if value > 0 else -math.inf
+
+
+def _energy_to_lufs(energy: np.ndarray | float) -> np.ndarray | float:
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(energy)
+
+
+def _finite_or_none(value: float) -> float | None:
+    return round(value, 3) if math.isfinite(value) else None
+
+
+@dataclass
+class BandEnergy:
+    center_hz: float
+    # Share of the total energy in dB (0 dB = all energy in this band)
+    energy_db: float | None
+
+
+@dataclass
+class AnalysisReport:
+    duration_seconds: float
+    integrated_lufs: float | None
+    gating_threshold_lufs: float | None
+    loudness_range_lu: float | None
+    true_peak_dbtp: float | None
+    sample_peak_dbfs: float | None
+    rms_dbfs: float | None
+    crest_factor_db: float | None
+    clipped_samples: int
+    clipped_ratio: float
+    clipping_detected: bool
+    bands: list[BandEnergy] = field(default_factory=list)
+    sample_rate: int = SAMPLE_RATE
+    channels: int = CHANNELS
+
+    def to_json(self) -> bytes:
+        return json.dumps({"version": REPORT_VERSION, **asdict(self)}).encode()
+
+    def loudnorm_measurement(self, target: LoudnessTarget) -> LoudnormMeasurement | None:
+        """
+        Loudnorm second-pass parameters from this report, so the ffmpeg loudnorm
+        analysis pass can be skipped. The offset is left at 0.
+        """
+        values = (
+            self.integrated_lufs,
+            self.true_peak_dbtp,
+            self.loudness_range_lu,
+            self.gating_threshold_lufs,
+        )
+        if any(v is None for v in values):
+            return None
+        input_i, input_tp, input_lra, input_thresh = (float(v) for v in values)  # type: ignore[arg-type]
+        return LoudnormMeasurement(
+            input_i=input_i,
+            input_tp=input_tp,
+            input_lra=input_lra,
+            input_thresh=input_thresh,
+            target_offset=0.0,
+            target=target,
+        )
+
+
+class Analyzer:
+    """Accumulates analysis state over consecutive (frames, channels) float32 blocks."""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> None:
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_frames = sample_rate  # 1 s of audio per analysis step
+        self._sub_block_frames = round(sample_rate / 10)  # 100 ms gating hop
+        self._frames = 0
+        # K-weighting filter memory and frames waiting for a full 100 ms sub-block
+        self._k_sos = k_weighting_sos(sample_rate)
+        self._k_state = np.zeros((self._k_sos.shape[0], 2, channels))
+        self._k_carry = np.zeros((0, channels), dtype=np.float32)
+        self._sub_block_energy: list[np.ndarray] = []
+        # Last input frames, prepended so oversampling is continuous across blocks
+        self._tp_context = np.zeros((TRUE_PEAK_CONTEXT, channels), dtype=np.float32)
+        self._true_peak = 0.0
+        self._sample_peak = 0.0
+        self._sum_squares = 0.0
+        self._clipped = 0
+        self._band_energy = np.zeros(len(OCTAVE_CENTERS_HZ))
+        self._band_masks: dict[int, list[np.ndarray]] = {}
+
+    def feed(self, block: np.ndarray) -> None:
+        if not len(block):
+            return
+        self._frames += len(block)
+        self._feed_loudness(block)
+        self._feed_peaks(block)
+        self._feed_bands(block)
+
+    def _feed_loudness(self, block: np.ndarray) -> None:
+        frames = np.concatenate([self._k_carry, block])
+        usable = len(frames) - len(frames) % self._sub_block_frames
+        self._k_carry = frames[usable:]
+        if not usable:
+            return
+        weighted, self._k_state = sosfilt(self._k_sos, frames[:usable], axis=0, zi=self._k_state)
+        # Mean square per channel per 100 ms, summed over channels (G = 1 for L/R)
+        energy = (
+            np.square(weighted)
+            .reshape(-1, self._sub_block_frames, self.channels)
+            .mean(axis=1)
+            .sum(axis=1)
+        )
+        self._sub_block_energy.append(energy)
+
+    def _feed_peaks(self, block: np.ndarray) -> None:
+        magnitude = np.abs(block)
+        self._sample_peak = max(self._sample_peak, float(magnitude.max()))
+        self._sum_squares += float(np.square(block, dtype=np.float64).sum())
+        self._clipped += int(np.count_nonzero(magnitude >= CLIP_LEVEL))
+
+        extended = np.concatenate([self._tp_context, block])
+        self._tp_context = extended[-TRUE_PEAK_CONTEXT:]
+        upsampled = upfirdn(TRUE_PEAK_FIR, extended, up=TRUE_PEAK_OVERSAMPLING, axis=0)
+        # Keep only outputs whose filter window is fully inside `extended`
+        valid = upsampled[TRUE_PEAK_TAPS - 1 : (len(extended) - 1) * TRUE_PEAK_OVERSAMPLING + 1]
+        if len(valid):
+            self._true_peak = max(self._true_peak, float(np.abs(valid).max()))
+
+    def _masks_for(self, frames: int) -> list[np.ndarray]:
+        masks = self._band_masks.get(frames)
+        if masks is None:
+            freqs = np.fft.rfftfreq(frames, d=1.0 / self.sample_rate)
+            masks = [
+                (freqs >= center / math.sqrt(2)) & (freqs < center * math.sqrt(2))
+                for center in OCTAVE_CENTERS_HZ
+            ]
+            self._band_masks[frames] = masks
+        return masks
+
+    def _feed_bands(self, block: np.ndarray) -> None:
+        mono = block.mean(axis=1) * np.hanning(len(block))
+        power = np.square(np.abs(np.fft.rfft(mono)))
+        for i, mask in enumerate(self._masks_for(len(block))):
+            self._band_energy[i] += float(power[mask].sum())
+
+    def _loudness(self) -> tuple[float, float, float]:
+        """Integrated loudness, its relative gate, and loudness range."""
+        if not self._sub_block_energy:
+            return -math.inf, -math.inf, 0.0
+        energy = np.concatenate(self._sub_block_energy)
+        cumulative = np.concatenate([[0.0], np.cumsum(energy)])
+
+        def windows(length: int) -> np.ndarray:
+            if len(energy) < length:
+                return np.zeros(0)
+            return (cumulative[length:] - cumulative[:-length]) / length
+
+        # Integrated: 400 ms blocks, 100 ms hop
+        blocks = windows(4)
+        gated = blocks[_energy_to_lufs(blocks) > -70.0]
+        if not len(gated):
+            return -math.inf, -math.inf, 0.0
+        threshold = float(_energy_to_lufs(gated.mean())) - 10.0
+        gated = gated[_energy_to_lufs(gated) > threshold]
+        integrated = float(_energy_to_lufs(gated.mean())) if len(gated) else -math.inf
+
+        # Loudness range: 3 s short-term windows, 100 ms hop
+        short_term = windows(30)
+        short_term = short_term[_energy_to_lufs(short_term) > -70.0]
+        lra = 0.0
+        if len(short_term):
+            relative = float(_energy_to_lufs(short_term.mean())) - 20.0
+            levels = np.asarray(_energy_to_lufs(short_term))
+            levels = levels[levels > relative]
+            if len(levels):
+                low, high = np.percentile(levels, [10, 95])
+                lra = float(high - low)
+        return integrated, threshold, lra
+
+    def report(self) -> AnalysisReport:
+        integrated, threshold, lra = self._loudness()
+        samples = self._frames * self.channels
+        rms = math.sqrt(self._sum_squares / samples) if samples else 0.0
+        sample_peak_db = _to_db(self._sample_peak)
+        rms_db = _to_db(rms)
+        total_band_energy = float(self._band_energy.sum())
+        clipped_ratio = self._clipped / samples if samples else 0.0
+        return AnalysisReport(
+            duration_seconds=round(self._frames / self.sample_rate, 3),
+            integrated_lufs=_finite_or_none(integrated),
+            gating_threshold_lufs=_finite_or_none(threshold),
+            loudness_range_lu=_finite_or_none(lra),
+            true_peak_dbtp=_finite_or_none(_to_db(max(self._true_peak, self._sample_peak))),
+            sample_peak_dbfs=_finite_or_none(sample_peak_db),
+            rms_dbfs=_finite_or_none(rms_db),
+            crest_factor_db=_finite_or_none(sample_peak_db - rms_db),
+            clipped_samples=self._clipped,
+            clipped_ratio=clipped_ratio,
+            clipping_detected=clipped_ratio > CLIP_RATIO_THRESHOLD,
+            bands=[
+                BandEnergy(
+                    center_hz=center,
+                    energy_db=_finite_or_none(
+                        10 * math.log10(energy / total_band_energy)
+                        if energy > 0 and total_band_energy > 0
+                        else -math.inf
+                    ),
+                )
+                for center, energy in zip(OCTAVE_CENTERS_HZ, self._band_energy)
+            ],
+            sample_rate=self.sample_rate,
+            channels=self.channels,
+        )
+
+
+async def _read_block(reader: asyncio.StreamReader, size: int) -> bytes:
+    try:
+        return await reader.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+
+
+async def analyze(source: FfmpegInput, analyzer: Analyzer | None = None) -> AnalysisReport:
+    """
+    Decode the input once and analyze it block by block. A caller-supplied
+    `analyzer` (e.g. a subclass collecting more state) must use SAMPLE_RATE.
+    """
+    analyzer = analyzer or Analyzer()
+    frame_bytes = CHANNELS * 4
+
+    async def _consume(reader: asyncio.StreamReader) -> None:
+        while raw := await _read_block(reader, analyzer.block_frames * frame_bytes):
+            usable = len(raw) - len(raw) % frame_bytes
+            block = np.frombuffer(raw[:usable], dtype="<f4").reshape(-1, CHANNELS)
+            # numpy/scipy release the GIL, keep the event loop responsive
+            await asyncio.to_thread(analyzer.feed, block)
+
+    await run_ffmpeg(
+        "analysis decode",
+        *source.args(),
+        "-vn",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-ac",
+        str(CHANNELS),
+        "-c:a",
+        "pcm_f32le",
+        "-f",
+        "f32le",
+        "pipe:1",
+        stdin=source.stdin(),
+        stdout=_consume,
+    )
+    return analyzer.report()
+
+
+def _analyze_blocks(buffer: PcmBuffer) -> AnalysisReport:
+    analyzer = Analyzer(buffer.sample_rate, buffer.channels)
+    for block in buffer.blocks(analyzer.block_frames):
+        analyzer.feed(block)
+    return analyzer.report()
+
+
+async def analyze_pcm(buffer: PcmBuffer) -> AnalysisReport:
+    """Analyze an already decoded PCM buffer without decoding again."""
+    return await asyncio.to_thread(_analyze_blocks, buffer)
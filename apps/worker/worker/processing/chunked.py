@@ -0,0 +1,135 @@
+"""
+Split-process-stitch mastering for long inputs.
+
+The whole track is measured once; each overlapping segment then gets the same
+linear gain and limiter in its own ffmpeg process (run in parallel through the
+process scheduler), and the segments are joined with sample-accurate linear
+crossfades over the overlap. Because every segment carries identical gain, the
+crossfade sums the same signal back to unity.
+"""
+
+import asyncio
+import os
+from typing import Callable
+
+from worker.processing.ffmpeg import FfmpegInput, ProgressCallback, run_ffmpeg
+from worker.processing.loudnorm import LoudnessTarget, LoudnormMeasurement
+
+SAMPLE_RATE = 44100
+
+
+def plan_segments(duration: float, segment_seconds: int, overlap_seconds: int) -> list[tuple[int, int | None]]:
+    """
+    Return (start, length) pairs in whole seconds; the last segment runs to the end
+    (length None). A tail shorter than two overlaps is folded into the previous segment.
+    """
+    starts = list(range(0, max(int(duration), 1), segment_seconds))
+    if len(starts) > 1 and duration - starts[-1] < 2 * overlap_seconds:
+        starts.pop()
+    return [
+        (start, segment_seconds + overlap_seconds if i < len(starts) - 1 else None)
+        for i, start in enumerate(starts)
+    ]
+
+
+def segment_filter(measurement: LoudnormMeasurement | None, target: LoudnessTarget) -> str:
+    gain_db = measurement.linear_gain_db(target) if measurement is not None else 0.0
+    limit = 10 ** (target.tp / 20)
+    # latency=1 compensates the limiter lookahead so segments stay sample aligned
+    return f"volume={gain_db:.4f}dB,alimiter=limit={limit:.4f}:level=false:latency=1"
+
+
+async def _render_segment(
+    source: FfmpegInput,
+    output_path: str,
+    start: int,
+    length: int | None,
+    audio_filter: str,
+    progress: ProgressCallback | None = None,
+) -> None:
+    args = ["-ss", str(start)]
+    if length is not None:
+        args += ["-t", str(length)]
+    await run_ffmpeg(
+        f"segment @{start}s",
+        *args,
+        *source.args(),
+        "-vn",
+        "-af",
+        audio_filter,
+        "-ar",
+        str(SAMPLE_RATE),
+        "-ac",
+        "2",
+        # Float intermediates so segments are quantized only once, at the stitch
+        "-c:a",
+        "pcm_f32le",
+        output_path,
+        progress=progress,
+    )
+
+
+async def _stitch(segment_paths: list[str], output_path: str, overlap_seconds: int) -> None:
+    overlap_samples = overlap_seconds * SAMPLE_RATE
+    inputs: list[str] = []
+    for path in segment_paths:
+        inputs += ["-i", path]
+
+    if len(segment_paths) == 1:
+        graph = "[0:a]anull[out]"
+    else:
+        steps: list[str] = []
+        previous = "[0:a]"
+        for i in range(1, len(segment_paths)):
+            label = "[out]" if i == len(segment_paths) - 1 else f"[x{i}]"
+            steps.append(f"{previous}[{i}:a]acrossfade=ns={overlap_samples}:c1=tri:c2=tri{label}")
+            previous = label
+        graph = ";".join(steps)
+
+    await run_ffmpeg(
+        "stitch",
+        *inputs,
+        "-filter_complex",
+        graph,
+        "-map",
+        "[out]",
+        "-c:a",
+        "pcm_s16le",
+        "-f",
+        "wav",
+        output_path,
+    )
+
+
+async def render_master(
+    source: FfmpegInput,
+    output_path: str,
+    duration: float,
+    measurement: LoudnormMeasurement | None,
+    target: LoudnessTarget,
+    tmpdir: str,
+    segment_seconds: int,
+    overlap_seconds: int,
+    progress: Callable[[str], ProgressCallback] | None = None,
+) -> None:
+    """
+    Master a long seekable input in parallel segments and stitch them into `output_path`.
+    `progress` maps a segment name to the callback tracking that segment's render.
+    """
+    audio_filter = segment_filter(measurement, target)
+    segments = plan_segments(duration, segment_seconds, overlap_seconds)
+    segment_paths = [os.path.join(tmpdir, f"segment-{i:04d}.wav") for i in range(len(segments))]
+
+    async with asyncio.TaskGroup() as tg:
+        for i, ((start, length), path) in enumerate(zip(segments, segment_paths)):
+            tracker = progress(f"segment-{i}") if progress is not None else None
+            tg.create_task(_render_segment(source, path, start, length, audio_filter, tracker))
+
+    try:
+        await _stitch(segment_paths, output_path, overlap_seconds)
+    finally:
+        for path in segment_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
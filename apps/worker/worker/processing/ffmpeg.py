@@ -0,0 +1,162 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from worker.core.scheduler import scheduler
+from worker.providers import files as files_provider
+
+
+@dataclass(frozen=True)
+class FfmpegInput:
+    """
+    Where ffmpeg reads the job input from: a local file, or an S3 object streamed
+    into its stdin. A streamed input is fetched again for every ffmpeg run.
+    `input_options` describe headerless inputs such as raw PCM.
+    """
+
+    path: str | None = None
+    object_key: str | None = None
+    input_options: tuple[str, ...] = ()
+
+    @property
+    def arg(self) -> str:
+        return self.path if self.path else "pipe:0"
+
+    def args(self) -> list[str]:
+        """Input options followed by `-i <input>`."""
+        return [*self.input_options, "-i", self.arg]
+
+    def stdin(self) -> AsyncIterator[bytes] | None:
+        if self.path or not self.object_key:
+            return None
+        return files_provider.stream_object(self.object_key)
+
+
+async def _feed_stdin(writer: asyncio.StreamWriter, chunks: AsyncIterator[bytes]) -> None:
+    try:
+        async for chunk in chunks:
+            writer.write(chunk)
+            await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg stopped reading (finished early or failed); its exit code tells which
+        pass
+    finally:
+        writer.close()
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class FfmpegError(RuntimeError):
+    """Non-zero ffmpeg exit; keeps the exit code and stderr for error classification."""
+
+    def __init__(self, label: str, returncode: int, stderr: str) -> None:
+        super().__init__(f"ffmpeg {label} failed: {stderr[:500]}")
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+StdoutSink = Callable[[asyncio.StreamReader], Awaitable[None]]
+# Receives the output position in seconds from ffmpeg's -progress blocks
+ProgressCallback = Callable[[float], Awaitable[None]]
+
+_PROGRESS_LINE_RE = re.compile(rb"^[a-z0-9_]+=")
+
+
+async def _read_stderr(reader: asyncio.StreamReader, progress: ProgressCallback) -> bytes:
+    """Collect stderr, forwarding out_time_us from interleaved -progress blocks."""
+    lines: list[bytes] = []
+    while line := await reader.readline():
+        if line.startswith(b"out_time_us="):
+            try:
+                await progress(int(line[len(b"out_time_us="):]) / 1_000_000)
+            except ValueError:
+                # "N/A" until the first frame is written
+                pass
+            continue
+        if _PROGRESS_LINE_RE.match(line):
+            continue
+        lines.append(line)
+    return b"".join(lines)
+
+
+async def run_ffmpeg(
+    label: str,
+    *args: str,
+    stdin: AsyncIterator[bytes] | None = None,
+    stdout: StdoutSink | None = None,
+    progress: ProgressCallback | None = None,
+) -> str:
+    """
+    Run ffmpeg with the given arguments and return its stderr.
+    Raise with a trimmed stderr on a non-zero exit code.
+
+    Waits for a free scheduler slot and pins ffmpeg's decoder and filter
+    threads to the slot's thread budget. When `stdin` is given its chunks are
+    piped to ffmpeg while it runs (use "pipe:0" as the input). When `stdout` is
+    given it consumes ffmpeg's stdout as it is produced (use "pipe:1" as an output).
+    When `progress` is given ffmpeg writes -progress blocks to stderr and the
+    callback receives each output position as it advances.
+    """
+    progress_args = ["-progress", "pipe:2", "-nostats"] if progress is not None else []
+    async with scheduler.slot() as threads:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-y",
+            "-filter_threads",
+            str(threads),
+            "-filter_complex_threads",
+            str(threads),
+            "-threads",
+            str(threads),
+            *progress_args,
+            *args,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Both are pipes above; stdin is one only when `stdin` is given
+        assert process.stdout is not None and process.stderr is not None
+        try:
+            _, stderr, _ = await asyncio.gather(
+                stdout(process.stdout) if stdout is not None else process.stdout.read(),
+                _read_stderr(process.stderr, progress) if progress is not None else process.stderr.read(),
+                _feed_stdin(process.stdin, stdin)
+                if stdin is not None and process.stdin is not None
+                else asyncio.sleep(0),
+            )
+            returncode = await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+    text = stderr.decode(errors="ignore")
+    if returncode != 0:
+        raise FfmpegError(label, returncode, text)
+    return text
+
+
+async def probe_duration(path: str) -> float | None:
+    """Container duration in seconds as reported by ffprobe, None if unknown."""
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        path,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        return None
+    try:
+        return float(stdout.decode().strip())
+    except ValueError:
+        return None
@@ -0,0 +1,178 @@
+import json
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Mapping
+
+from worker.processing.ffmpeg import FfmpegInput, run_ffmpeg
+from worker.providers import files as files_provider
+
+CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class LoudnessTarget:
+    i: float = -14.0
+    tp: float = -1.5
+    lra: float = 11.0
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> "LoudnessTarget":
+        """Build a target from job params, falling back to defaults per field."""
+        default = cls()
+        return cls(
+            i=float(params.get("target_lufs", default.i)),
+            tp=float(params.get("target_tp", default.tp)),
+            lra=float(params.get("target_lra", default.lra)),
+        )
+
+    def dynamic_filter(self) -> str:
+        """Single-pass (dynamic) loudnorm filter."""
+        return f"loudnorm=I={self.i}:TP={self.tp}:LRA={self.lra}"
+
+    def analysis_filter(self) -> str:
+        """First-pass loudnorm filter that only prints its measurements."""
+        return f"{self.dynamic_filter()}:print_format=json"
+
+
+@dataclass(frozen=True)
+class LoudnormMeasurement:
+    input_i: float
+    input_tp: float
+    input_lra: float
+    input_thresh: float
+    target_offset: float
+    # Target the first pass was run against; target_offset is only exact for it
+    target: LoudnessTarget
+
+    def offset_for(self, target: LoudnessTarget) -> float:
+        return self.target_offset if target == self.target else 0.0
+
+    def linear_gain_db(self, target: LoudnessTarget) -> float:
+        """Static gain loudnorm's linear mode applies for `target`."""
+        return target.i - self.input_i + self.offset_for(target)
+
+    def linear_filter(self, target: LoudnessTarget) -> str:
+        """Second-pass loudnorm filter applying a linear gain from measurements."""
+        offset = self.offset_for(target)
+        return (
+            f"{target.dynamic_filter()}"
+            f":measured_I={self.input_i}"
+            f":measured_TP={self.input_tp}"
+            f":measured_LRA={self.input_lra}"
+            f":measured_thresh={self.input_thresh}"
+            f":offset={offset}"
+            ":linear=true"
+        )
+
+    def to_json(self) -> bytes:
+        return json.dumps({"version": CACHE_VERSION, **asdict(self)}).encode()
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "LoudnormMeasurement | None":
+        try:
+            doc = json.loads(raw.decode())
+            if doc.get("version") != CACHE_VERSION:
+                return None
+            return cls(
+                input_i=float(doc["input_i"]),
+                input_tp=float(doc["input_tp"]),
+                input_lra=float(doc["input_lra"]),
+                input_thresh=float(doc["input_thresh"]),
+                target_offset=float(doc["target_offset"]),
+                target=LoudnessTarget(**doc["target"]),
+            )
+        except Exception:
+            return None
+
+
+def parse_measurement(stderr: str, target: LoudnessTarget) -> LoudnormMeasurement | None:
+    """
+    Extract the JSON block printed by loudnorm at the end of the analysis pass.
+    Return None when the block is missing or not usable (e.g. digital silence).
+    """
+    start = stderr.rfind("{")
+    end = stderr.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        doc = json.loads(stderr[start : end + 1])
+        values = [
+            float(doc[name])
+            for name in ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+        ]
+    except (ValueError, KeyError):
+        return None
+    if not all(math.isfinite(v) for v in values):
+        return None
+    return LoudnormMeasurement(*values, target=target)
+
+
+def cache_key(object_key: str, etag: str) -> str:
+    """Measurements live next to the asset's original, one file per uploaded content."""
+    asset_prefix = object_key.rsplit("/", 1)[0]
+    return f"{asset_prefix}/loudnorm/{etag}.json"
+
+
+async def measure(source: FfmpegInput, target: LoudnessTarget) -> LoudnormMeasurement | None:
+    """Run the loudnorm analysis pass over the input."""
+    stderr = await run_ffmpeg(
+        "loudnorm analysis",
+        "-hide_banner",
+        "-nostats",
+        *source.args(),
+        "-af",
+        target.analysis_filter(),
+        "-f",
+        "null",
+        "-",
+        stdin=source.stdin(),
+    )
+    return parse_measurement(stderr, target)
+
+
+async def measure_cached(
+    source: FfmpegInput,
+    object_key: str,
+    etag: str | None,
+    target: LoudnessTarget,
+    measured: LoudnormMeasurement | None = None,
+) -> LoudnormMeasurement | None:
+    """
+    Return measurements for the input, reusing the ones stored for this asset ETag.
+    Without an ETag nothing is cached. On a cache miss `measured` (e.g. from the
+    analysis module) is used instead of running the ffmpeg analysis pass.
+    """
+    if not etag:
+        return measured or await measure(source, target)
+
+    key = cache_key(object_key, etag)
+    raw = await files_provider.get_bytes(key)
+    if raw is not None:
+        cached = LoudnormMeasurement.from_json(raw)
+        if cached is not None:
+            return cached
+
+    measurement = measured or await measure(source, target)
+    if measurement is not None:
+        await files_provider.put_bytes(measurement.to_json(), key, "application/json")
+    return measurement
+
+
+async def build_filter(
+    source: FfmpegInput,
+    object_key: str,
+    etag: str | None,
+    target: LoudnessTarget,
+    two_pass: bool = True,
+    measured: LoudnormMeasurement | None = None,
+) -> str:
+    """
+    Loudnorm filter for the render pass: linear when measurements are available,
+    dynamic single-pass otherwise.
+    """
+    if not two_pass:
+        return target.dynamic_filter()
+    measurement = await measure_cached(source, object_key, etag, target, measured)
+    if measurement is None:
+        return target.dynamic_filter()
+    return measurement.linear_filter(target)
@@ -0,0 +1,91 @@
+"""
+Decoded-PCM working buffer shared by the processing stages of one job.
+
+The input is decoded once to interleaved float32 in the job's temp dir and
+opened as a read-only memory map. Python stages get zero-copy NumPy views of
+it; ffmpeg stages read the same file as raw PCM via `as_input()`, so nothing
+decodes the original again and resident memory stays flat regardless of
+input size.
+"""
+
+import os
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from worker.core.retry import FatalJobError
+from worker.processing.ffmpeg import FfmpegInput, run_ffmpeg
+
+CHANNELS = 2
+BYTES_PER_SAMPLE = 4
+
+_OUTPUT_RATE_RE = re.compile(r"Output #0.*?Audio: pcm_f32le[^\n]*?, (\d+) Hz", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class PcmBuffer:
+    path: str
+    sample_rate: int
+    channels: int = CHANNELS
+
+    @property
+    def frames(self) -> int:
+        return os.path.getsize(self.path) // (self.channels * BYTES_PER_SAMPLE)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    @cached_property
+    def array(self) -> np.ndarray:
+        """(frames, channels) read-only view backed by the file."""
+        if not self.frames:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.memmap(self.path, dtype="<f4", mode="r", shape=(self.frames, self.channels))
+
+    def window(self, start_frame: int, frames: int) -> np.ndarray:
+        return self.array[start_frame : start_frame + frames]
+
+    def blocks(self, block_frames: int) -> Iterator[np.ndarray]:
+        for start in range(0, self.frames, block_frames):
+            yield self.window(start, block_frames)
+
+    def as_input(self) -> FfmpegInput:
+        """The buffer as an ffmpeg input (raw PCM needs its format spelled out)."""
+        return FfmpegInput(
+            path=self.path,
+            input_options=(
+                "-f",
+                "f32le",
+                "-ar",
+                str(self.sample_rate),
+                "-ac",
+                str(self.channels),
+            ),
+        )
+
+
+async def decode(source: FfmpegInput, tmpdir: str) -> PcmBuffer:
+    """Decode the input once to float32 at its native sample rate."""
+    path = os.path.join(tmpdir, "decoded.f32")
+    stderr = await run_ffmpeg(
+        "decode",
+        *source.args(),
+        "-vn",
+        "-ac",
+        str(CHANNELS),
+        "-c:a",
+        "pcm_f32le",
+        "-f",
+        "f32le",
+        path,
+        stdin=source.stdin(),
+    )
+    # Raw PCM has no header; take the output rate from ffmpeg's stream summary
+    match = _OUTPUT_RATE_RE.search(stderr)
+    if match is None:
+        raise FatalJobError("could not determine decoded sample rate")
+    return PcmBuffer(path=path, sample_rate=int(match.group(1)))
@@ -0,0 +1,73 @@
+import re
+
+from worker.processing.ffmpeg import FfmpegInput, run_ffmpeg
+from worker.processing.loudnorm import LoudnessTarget
+
+# Keep the fast preview from blowing up near-silent intros
+MAX_GAIN_DB = 24.0
+
+_INTEGRATED_RE = re.compile(r"Integrated loudness:\s*I:\s*(-?[\d.]+|-inf)\s*LUFS")
+
+
+def parse_integrated_loudness(stderr: str) -> float | None:
+    """Read the integrated loudness from the ebur128 summary printed at the end."""
+    matches = _INTEGRATED_RE.findall(stderr)
+    if not matches or matches[-1] == "-inf":
+        return None
+    return float(matches[-1])
+
+
+async def estimate_gain_db(source: FfmpegInput, target: LoudnessTarget, duration_seconds: int) -> float:
+    """
+    Quick gain estimate from the integrated loudness of the first `duration_seconds`.
+    Much cheaper than a full loudnorm analysis, good enough for an instant preview.
+    """
+    stderr = await run_ffmpeg(
+        "preview analysis",
+        "-hide_banner",
+        "-nostats",
+        "-t",
+        str(duration_seconds),
+        *source.args(),
+        "-vn",
+        "-af",
+        "ebur128=framelog=quiet",
+        "-f",
+        "null",
+        "-",
+        stdin=source.stdin(),
+    )
+    measured = parse_integrated_loudness(stderr)
+    if measured is None:
+        return 0.0
+    return max(min(target.i - measured, MAX_GAIN_DB), -MAX_GAIN_DB)
+
+
+async def render_fast_preview(
+    source: FfmpegInput, output_path: str, target: LoudnessTarget, duration_seconds: int
+) -> None:
+    """
+    Encode the first `duration_seconds` of the raw input to mp3 with a static gain
+    and a peak limiter at the target true peak.
+    """
+    gain_db = await estimate_gain_db(source, target, duration_seconds)
+    limit = 10 ** (target.tp / 20)
+    await run_ffmpeg(
+        "fast preview",
+        "-t",
+        str(duration_seconds),
+        *source.args(),
+        "-vn",
+        "-af",
+        f"volume={gain_db:.2f}dB,alimiter=limit={limit:.4f}:level=false",
+        "-ar",
+        "44100",
+        "-ac",
+        "2",
+        "-c:a",
+        "libmp3lame",
+        "-b:a",
+        "192k",
+        output_path,
+        stdin=source.stdin(),
+    )
@@ -0,0 +1,65 @@
+"""
+Job progress from ffmpeg's -progress output.
+
+Each tracked ffmpeg run reports how many seconds of audio it has written;
+parallel runs (chunked segments) report under their own key and are summed.
+Against the known input duration that gives percent, ETA and the realtime
+factor of the render, published as rate-limited job.progress events.
+"""
+
+import time
+from typing import Awaitable, Callable
+
+from worker.processing.ffmpeg import ProgressCallback
+
+Publish = Callable[[dict], Awaitable[None]]
+
+
+class ProgressReporter:
+    def __init__(self, publish: Publish, duration: float | None, interval: float, stage: str = "master") -> None:
+        self._publish = publish
+        self.duration = duration
+        self.interval = interval
+        self.stage = stage
+        self._rendered: dict[str, float] = {}
+        self._started = time.monotonic()
+        self._last_sent: float | None = None
+
+    def track(self, key: str = "main") -> ProgressCallback:
+        """Progress callback for one ffmpeg run."""
+
+        async def on_progress(out_time: float) -> None:
+            self._rendered[key] = out_time
+            await self._maybe_publish()
+
+        return on_progress
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        rendered = sum(self._rendered.values())
+        realtime_factor = rendered / elapsed
+        out: dict = {
+            "stage": self.stage,
+            "renderedSeconds": round(rendered, 2),
+            "elapsedSeconds": round(elapsed, 2),
+            "realtimeFactor": round(realtime_factor, 2),
+            "percent": None,
+            "etaSeconds": None,
+        }
+        if self.duration:
+            # Never report 100 before the uploads are finished and job.done is out
+            out["percent"] = round(min(rendered / self.duration * 100, 99.9), 1)
+            if realtime_factor > 0:
+                out["etaSeconds"] = round(max(self.duration - rendered, 0.0) / realtime_factor, 1)
+        return out
+
+    async def _maybe_publish(self) -> None:
+        now = time.monotonic()
+        if self._last_sent is not None and now - self._last_sent < self.interval:
+            return
+        self._last_sent = now
+        try:
+            await self._publish(self.snapshot())
+        except Exception as e:
+            # Progress is advisory; never fail the render over it
+            print(f"[worker] progress publish failed: {e}")
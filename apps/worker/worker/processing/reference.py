@@ -0,0 +1,173 @@
+"""
+Reference-track profile (PLAN reference mastering).
+
+A reference is usually shared by every track of an album, so its analysis is
+computed once per reference asset and ETag and stored next to the asset as a
+small binary blob (NumPy .npz, well under 1 KB). Later jobs fetch the blob
+instead of downloading and decoding the reference audio again.
+
+The profile holds the loudness and dynamics figures from `analysis.Analyzer`
+plus a long-term 1/3-octave spectrum for tonal-balance / match-EQ stages.
+"""
+
+import asyncio
+import io
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from worker.processing import analysis
+from worker.processing.ffmpeg import FfmpegInput
+from worker.providers import files as files_provider
+
+PROFILE_VERSION = 1
+
+# ISO 266 1/3-octave centers from 25 Hz to 20 kHz
+THIRD_OCTAVE_CENTERS_HZ = tuple(1000 * 2 ** (n / 3) for n in range(-16, 14))
+
+_SUMMARY_FIELDS = (
+    "integrated_lufs",
+    "loudness_range_lu",
+    "true_peak_dbtp",
+    "rms_dbfs",
+    "crest_factor_db",
+)
+
+
+@dataclass
+class ReferenceProfile:
+    summary: dict[str, float | None]
+    # Share of total energy per 1/3-octave band in dB, THIRD_OCTAVE_CENTERS_HZ order
+    spectrum_db: np.ndarray
+
+    def to_bytes(self) -> bytes:
+        summary = np.array(
+            [np.nan if self.summary.get(n) is None else self.summary[n] for n in _SUMMARY_FIELDS],
+            dtype=np.float32,
+        )
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            version=np.int32(PROFILE_VERSION),
+            summary=summary,
+            spectrum_db=self.spectrum_db.astype(np.float32),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "ReferenceProfile | None":
+        try:
+            with np.load(io.BytesIO(raw), allow_pickle=False) as doc:
+                if int(doc["version"]) != PROFILE_VERSION:
+                    return None
+                summary = doc["summary"]
+                spectrum_db = doc["spectrum_db"]
+            if len(summary) != len(_SUMMARY_FIELDS) or len(spectrum_db) != len(THIRD_OCTAVE_CENTERS_HZ):
+                return None
+            return cls(
+                summary={
+                    name: round(float(value), 3) if math.isfinite(value) else None
+                    for name, value in zip(_SUMMARY_FIELDS, summary.tolist())
+                },
+                spectrum_db=spectrum_db,
+            )
+        except Exception:
+            return None
+
+
+class ProfileAnalyzer(analysis.Analyzer):
+    """`Analyzer` that also accumulates a 1/3-octave power spectrum."""
+
+    def __init__(self, sample_rate: int = analysis.SAMPLE_RATE, channels: int = analysis.CHANNELS) -> None:
+        super().__init__(sample_rate, channels)
+        self._spectrum = np.zeros(len(THIRD_OCTAVE_CENTERS_HZ))
+        self._spectrum_masks: dict[int, list[np.ndarray]] = {}
+
+    def feed(self, block: np.ndarray) -> None:
+        super().feed(block)
+        if len(block):
+            self._feed_spectrum(block)
+
+    def _feed_spectrum(self, block: np.ndarray) -> None:
+        masks = self._spectrum_masks.get(len(block))
+        if masks is None:
+            freqs = np.fft.rfftfreq(len(block), d=1.0 / self.sample_rate)
+            edge = 2 ** (1 / 6)
+            masks = [(freqs >= c / edge) & (freqs < c * edge) for c in THIRD_OCTAVE_CENTERS_HZ]
+            self._spectrum_masks[len(block)] = masks
+        mono = block.mean(axis=1) * np.hanning(len(block))
+        power = np.square(np.abs(np.fft.rfft(mono)))
+        for i, mask in enumerate(masks):
+            self._spectrum[i] += float(power[mask].sum())
+
+    def profile(self) -> ReferenceProfile:
+        report = self.report()
+        total = float(self._spectrum.sum())
+        with np.errstate(divide="ignore"):
+            spectrum_db = 10 * np.log10(self._spectrum / total) if total > 0 else np.full_like(self._spectrum, -np.inf)
+        return ReferenceProfile(
+            summary={name: getattr(report, name) for name in _SUMMARY_FIELDS},
+            spectrum_db=spectrum_db.astype(np.float32),
+        )
+
+
+def cache_key(object_key: str, etag: str) -> str:
+    """
+    Profiles live next to the reference asset's original, one per uploaded
+    content and profile format, so an existing key is always a usable profile.
+    """
+    asset_prefix = object_key.rsplit("/", 1)[0]
+    return f"{asset_prefix}/reference/{etag}.v{PROFILE_VERSION}.npz"
+
+
+async def analyze(source: FfmpegInput) -> ReferenceProfile:
+    analyzer = ProfileAnalyzer()
+    await analysis.analyze(source, analyzer)
+    return analyzer.profile()
+
+
+async def _compute_profile(object_key: str, tmpdir: str) -> ReferenceProfile:
+    # Downloaded rather than streamed: containers with a trailing index need seeking
+    path = os.path.join(tmpdir, "reference")
+    await files_provider.download_file(object_key, path)
+    try:
+        return await analyze(FfmpegInput(path=path))
+    finally:
+        await asyncio.to_thread(os.remove, path)
+
+
+async def ensure_profile(object_key: str, etag: str | None, tmpdir: str) -> bool:
+    """
+    Compute and store the profile unless it is already cached; a cache hit costs
+    one HEAD. Returns whether it was computed. Without an ETag nothing can be
+    cached, so nothing is done.
+    """
+    if not etag:
+        return False
+    key = cache_key(object_key, etag)
+    if await files_provider.exists(key):
+        return False
+    profile = await _compute_profile(object_key, tmpdir)
+    await files_provider.put_bytes(profile.to_bytes(), key, "application/octet-stream")
+    return True
+
+
+async def load_profile(object_key: str, etag: str | None, tmpdir: str) -> ReferenceProfile:
+    """
+    Return the reference profile, computing and storing it on the first use of
+    this reference content. Without an ETag the profile is computed every time.
+    """
+    key = cache_key(object_key, etag) if etag else None
+    if key is not None:
+        raw = await files_provider.get_bytes(key)
+        if raw is not None:
+            cached = ReferenceProfile.from_bytes(raw)
+            if cached is not None:
+                return cached
+
+    profile = await _compute_profile(object_key, tmpdir)
+    if key is not None:
+        await files_provider.put_bytes(profile.to_bytes(), key, "application/octet-stream")
+    return profile
@@ -0,0 +1,23 @@
+import struct
+
+
+def patch_header_sizes(head: bytes, total_size: int) -> bytes:
+    """
+    Fill in the RIFF and data chunk sizes of a WAV header written to a pipe.
+
+    ffmpeg cannot seek back on a non-seekable output, so a streamed WAV carries
+    placeholder sizes. `head` must contain everything up to the data chunk header.
+    """
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE stream")
+    buf = bytearray(head)
+    struct.pack_into("<I", buf, 4, min(total_size - 8, 0xFFFFFFFF))
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos : pos + 4])
+        if chunk_id == b"data":
+            struct.pack_into("<I", buf, pos + 4, min(total_size - pos - 8, 0xFFFFFFFF))
+            return bytes(buf)
+        (chunk_size,) = struct.unpack_from("<I", buf, pos + 4)
+        pos += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError("data chunk not found in WAV header")
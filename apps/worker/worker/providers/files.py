@@ -1,22 +1,271 @@
 import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
 
-from worker.core.s3 import s3
+from botocore.exceptions import ClientError
+
+from worker.core.s3 import get_client
 from worker.core.settings import settings
 
+HeadPatcher = Callable[[bytes, int], bytes]
+PartReader = Callable[[int], Awaitable[bytes]]
+
+
+def _transfer_concurrency() -> int:
+    return max(settings.S3_TRANSFER_CONCURRENCY, 1)
+
 
 async def download_file(object_key: str, dest_path: str) -> None:
-    """Download an object from S3 to a local destination path."""
-    await asyncio.to_thread(s3.download_file, settings.S3_BUCKET, object_key, dest_path)
+    """
+    Download an object from S3 to a local destination path.
+    Objects above the multipart threshold are fetched as concurrent ranged GETs.
+    """
+    client = await get_client()
+    head = await client.head_object(Bucket=settings.S3_BUCKET, Key=object_key)
+    size = int(head["ContentLength"])
+
+    if size <= settings.S3_MULTIPART_THRESHOLD_BYTES:
+        resp = await client.get_object(Bucket=settings.S3_BUCKET, Key=object_key)
+        with open(dest_path, "wb") as f:
+            async with resp["Body"] as body:
+                while chunk := await body.read(settings.S3_STREAM_CHUNK_BYTES):
+                    f.write(chunk)
+        return
+
+    with open(dest_path, "wb") as f:
+        f.truncate(size)
+    fd = os.open(dest_path, os.O_WRONLY)
+    slots = asyncio.Semaphore(_transfer_concurrency())
+
+    async def _fetch_range(start: int, end: int) -> None:
+        async with slots:
+            resp = await client.get_object(
+                Bucket=settings.S3_BUCKET, Key=object_key, Range=f"bytes={start}-{end}"
+            )
+            async with resp["Body"] as body:
+                data = await body.read()
+            await asyncio.to_thread(os.pwrite, fd, data, start)
+
+    part = settings.S3_MULTIPART_PART_BYTES
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for start in range(0, size, part):
+                tg.create_task(_fetch_range(start, min(start + part, size) - 1))
+    finally:
+        os.close(fd)
 
 
 async def upload_file(src_path: str, object_key: str, content_type: str) -> None:
-    """Upload a local file to S3 with provided content type."""
-    await asyncio.to_thread(
-        s3.upload_file,
-        src_path,
-        settings.S3_BUCKET,
-        object_key,
-        ExtraArgs={"ContentType": content_type},
-    )
+    """
+    Upload a local file to S3 with provided content type.
+    Files above the multipart threshold are uploaded as concurrent parts.
+    """
+    if os.path.getsize(src_path) <= settings.S3_MULTIPART_THRESHOLD_BYTES:
+        with open(src_path, "rb") as f:
+            data = await asyncio.to_thread(f.read)
+        await put_bytes(data, object_key, content_type)
+        return
+
+    with open(src_path, "rb") as f:
+        async with multipart_upload(object_key, content_type) as upload:
+            await upload.consume_parts(lambda n: asyncio.to_thread(f.read, n))
+
+
+async def _read_part(reader: asyncio.StreamReader, size: int) -> bytes:
+    chunks: list[bytes] = []
+    remaining = size
+    while remaining:
+        chunk = await reader.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class MultipartUpload:
+    """
+    S3 multipart upload fed from a stream while the stream is still being produced.
+
+    Parts are uploaded concurrently as soon as they fill up. With `patch_head` the
+    first part is held back and rewritten with the final stream size before it is
+    sent (S3 accepts parts in any order), e.g. to fix up a streamed WAV header.
+    """
+
+    def __init__(self, object_key: str, content_type: str, patch_head: HeadPatcher | None = None) -> None:
+        self.object_key = object_key
+        self.content_type = content_type
+        self._patch_head = patch_head
+        self._upload_id: str | None = None
+        self._parts: dict[int, str] = {}
+        self._head: bytes | None = None
+        self._size = 0
+        self._inflight: set[asyncio.Task] = set()
+        self._slots = asyncio.Semaphore(_transfer_concurrency())
+
+    async def start(self) -> None:
+        client = await get_client()
+        resp = await client.create_multipart_upload(
+            Bucket=settings.S3_BUCKET,
+            Key=self.object_key,
+            ContentType=self.content_type,
+        )
+        self._upload_id = resp["UploadId"]
 
+    @property
+    def upload_id(self) -> str:
+        if self._upload_id is None:
+            raise RuntimeError(f"multipart upload of {self.object_key} was not started")
+        return self._upload_id
 
+    async def _upload_part(self, number: int, data: bytes) -> None:
+        try:
+            client = await get_client()
+            resp = await client.upload_part(
+                Bucket=settings.S3_BUCKET,
+                Key=self.object_key,
+                UploadId=self.upload_id,
+                PartNumber=number,
+                Body=data,
+            )
+            self._parts[number] = resp["ETag"]
+        finally:
+            self._slots.release()
+
+    def _raise_failed_parts(self) -> None:
+        for task in [t for t in self._inflight if t.done()]:
+            self._inflight.discard(task)
+            task.result()
+
+    async def consume(self, reader: asyncio.StreamReader) -> None:
+        """Read the stream to EOF, uploading each full part while reading continues."""
+        await self.consume_parts(lambda size: _read_part(reader, size))
+
+    async def consume_parts(self, read_part: PartReader) -> None:
+        """Pull parts from `read_part` until it returns empty bytes, uploading concurrently."""
+        number = 0
+        while True:
+            # Waiting for a slot before reading applies backpressure to the producer
+            await self._slots.acquire()
+            try:
+                data = await read_part(settings.S3_MULTIPART_PART_BYTES)
+            except BaseException:
+                self._slots.release()
+                raise
+            if not data:
+                self._slots.release()
+                break
+            number += 1
+            self._size += len(data)
+            if number == 1 and self._patch_head is not None:
+                self._head = data
+                self._slots.release()
+                continue
+            self._inflight.add(asyncio.create_task(self._upload_part(number, data)))
+            self._raise_failed_parts()
+        await self._drain()
+
+    async def _drain(self) -> None:
+        if self._inflight:
+            await asyncio.gather(*self._inflight)
+        self._inflight.clear()
+
+    async def complete(self) -> None:
+        await self._drain()
+        if self._head is not None and self._patch_head is not None:
+            await self._slots.acquire()
+            await self._upload_part(1, self._patch_head(self._head, self._size))
+            self._head = None
+        if not self._parts:
+            raise RuntimeError(f"nothing was written to {self.object_key}")
+        client = await get_client()
+        await client.complete_multipart_upload(
+            Bucket=settings.S3_BUCKET,
+            Key=self.object_key,
+            UploadId=self.upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": n, "ETag": etag} for n, etag in sorted(self._parts.items())]
+            },
+        )
+
+    async def abort(self) -> None:
+        for task in self._inflight:
+            task.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._inflight.clear()
+        if self._upload_id is None:
+            return
+        try:
+            client = await get_client()
+            await client.abort_multipart_upload(
+                Bucket=settings.S3_BUCKET,
+                Key=self.object_key,
+                UploadId=self._upload_id,
+            )
+        except Exception as e:
+            print(f"[worker] failed to abort multipart upload {self.object_key}: {e}")
+
+
+@asynccontextmanager
+async def multipart_upload(
+    object_key: str, content_type: str, patch_head: HeadPatcher | None = None
+) -> AsyncIterator[MultipartUpload]:
+    """
+    Open a streaming multipart upload. It is completed when the block exits
+    normally and aborted if the block (or completing it) raises.
+    """
+    upload = MultipartUpload(object_key, content_type, patch_head)
+    await upload.start()
+    try:
+        yield upload
+        await upload.complete()
+    except BaseException:
+        await upload.abort()
+        raise
+
+
+async def stream_object(object_key: str, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+    """Yield an object's body in chunks without writing it to disk."""
+    size = chunk_size or settings.S3_STREAM_CHUNK_BYTES
+    client = await get_client()
+    resp = await client.get_object(Bucket=settings.S3_BUCKET, Key=object_key)
+    async with resp["Body"] as body:
+        while chunk := await body.read(size):
+            yield chunk
+
+
+async def exists(object_key: str) -> bool:
+    """HEAD the object; False if it does not exist."""
+    client = await get_client()
+    try:
+        await client.head_object(Bucket=settings.S3_BUCKET, Key=object_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return False
+        raise
+    return True
+
+
+async def get_bytes(object_key: str) -> bytes | None:
+    """Read a small object fully into memory. Return None if it does not exist."""
+    client = await get_client()
+    try:
+        resp = await client.get_object(Bucket=settings.S3_BUCKET, Key=object_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    async with resp["Body"] as body:
+        return await body.read()
+
+
+async def put_bytes(data: bytes, object_key: str, content_type: str) -> None:
+    """Write a small in-memory payload to S3."""
+    client = await get_client()
+    await client.put_object(
+        Bucket=settings.S3_BUCKET,
+        Key=object_key,
+        Body=data,
+        ContentType=content_type,
+    )